@@ -5,12 +5,19 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
 
+from downsample import HALF_CHART_WIDTH, downsample_series, line_mode
+from page_registry import PAGES, render_page
+from query_backend import DATA_SOURCE, current_backend
+import spans
+
 # Configure page layout and title
 st.set_page_config(
     page_title="Task360",
     layout="wide",
     initial_sidebar_state="expanded"
 )
+# Time this rerun's sections when enabled (see the debug panel at the bottom)
+spans.begin_page()
 
 # Custom CSS for dark theme
 st.markdown("""
@@ -255,38 +262,31 @@ st.markdown("""
     </h1>
 """, unsafe_allow_html=True)
 
-# Load data
-@st.cache_data
-def load_data():
+# Query backend behind the widgets: the in-memory rollup for the CSV (the
+# shared loader parses it once per process and afterwards only the appended
+# rows), or DuckDB over a Parquet dataset (see query_backend.py)
+def load_backend():
     try:
-        df = pd.read_csv("facility_tasks (2).csv", encoding="ISO-8859-1")
-        df.columns = df.columns.str.strip()
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        df['date'] = df['Timestamp'].dt.date
-        df['missed'] = (df['Task_Status'].str.lower() == "missed").astype(int)
-        df['Hour_of_Day'] = df['Timestamp'].dt.hour
-        df['Day_of_Week'] = df['Timestamp'].dt.dayofweek
-        df['Weekend'] = df['Day_of_Week'].apply(lambda x: 1 if x >= 5 else 0)
-        return df
+        return current_backend()
     except FileNotFoundError:
-        st.error("Data file not found. Please ensure 'facility_tasks (2).csv' is in the correct location.")
+        st.error(f"Data file not found. Please ensure '{DATA_SOURCE}' is in the correct location.")
         return None
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
-df = load_data()
+with spans.span("app.load_data"):
+    backend = load_backend()
 
-if df is not None:
+if backend is not None:
     # Main Dashboard Content
     if st.session_state.current_page == "Dashboard":
         # Top Row: Key Metrics with custom styling
         st.markdown("### 📈 Key Performance Indicators")
         col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            total_tasks = len(df)
-            total_missed = df['missed'].sum()
+        with col1, spans.span("dashboard.kpi.risk"):
+            total_tasks, total_missed = backend.totals()
             risk_score = (total_missed / total_tasks) * 100 if total_tasks > 0 else 0
             st.metric(
                 label="Overall Risk Score",
@@ -295,9 +295,10 @@ if df is not None:
                 delta_color="inverse"
             )
         
-        with col2:
-            today_tasks = df[df['date'] == df['date'].max()]
-            completed_today = len(today_tasks[today_tasks['Task_Status'] == 'Completed'])
+        with col2, spans.span("dashboard.kpi.today"):
+            last_date = backend.date_bounds()[1]
+            today_counts = backend.status_counts_on(last_date) if last_date is not None else pd.Series(dtype=int)
+            completed_today = int(today_counts.get('Completed', 0))
             st.metric(
                 label="Tasks Completed Today",
                 value=f"{completed_today}",
@@ -306,7 +307,7 @@ if df is not None:
             )
         
         with col3:
-            missed_today = len(today_tasks[today_tasks['Task_Status'] == 'Missed'])
+            missed_today = int(today_counts.get('Missed', 0))
             st.metric(
                 label="Missed Tasks Today",
                 value=f"{missed_today}",
@@ -327,7 +328,7 @@ if df is not None:
         st.markdown("### 📊 Performance Analysis")
         col5, col6 = st.columns(2)
         
-        with col5:
+        with col5, spans.span("dashboard.gauge"):
             st.markdown("#### Task Miss Risk Gauge")
             fig_gauge = go.Figure(go.Indicator(
                 mode="gauge+number",
@@ -350,19 +351,18 @@ if df is not None:
             fig_gauge.update_layout(height=400, margin=dict(l=10, r=10, t=30, b=10))
             st.plotly_chart(fig_gauge, use_container_width=True)
         
-        with col6:
+        with col6, spans.span("dashboard.trend") as section:
             st.markdown("#### Daily Task Completion Trend")
-            daily_trend = df.groupby("date").agg({
-                'Task_Status': lambda x: (x == 'Completed').sum(),
-                'missed': 'sum'
-            }).reset_index()
-            daily_trend.columns = ['date', 'completed', 'missed']
+            # Re-aggregated and thinned to what a half-width chart can show
+            daily_trend, bucket = downsample_series(backend.daily_trend(), 'date',
+                                                    ['completed', 'missed'], HALF_CHART_WIDTH)
             
             fig_trend = px.line(daily_trend, x='date', y=['completed', 'missed'],
                                title="Task Completion vs Missed Tasks",
-                               labels={'value': 'Number of Tasks', 'date': 'Date'},
+                               labels={'value': f'Number of Tasks per {bucket}', 'date': 'Date'},
                                color_discrete_sequence=['#4CAF50', '#F44336'])
-            fig_trend.update_traces(mode="markers+lines")
+            fig_trend.update_traces(mode=line_mode(len(daily_trend)))
+            section.rows = len(daily_trend)
             fig_trend.update_layout(height=400, margin=dict(l=10, r=10, t=30, b=10))
             st.plotly_chart(fig_trend, use_container_width=True)
 
@@ -370,9 +370,9 @@ if df is not None:
         st.markdown("### 📋 Recent Activity & Insights")
         col7, col8 = st.columns(2)
         
-        with col7:
+        with col7, spans.span("dashboard.recent_activity", rows=5):
             st.markdown("#### Recent Activity")
-            recent_tasks = df.sort_values('Timestamp', ascending=False).head(5)
+            recent_tasks = backend.recent(5)
             for _, task in recent_tasks.iterrows():
                 task_type = task.get('Task_Type', 'Unnamed Task')
                 task_status = task.get('Task_Status', 'Unknown Status')
@@ -397,14 +397,14 @@ if df is not None:
                     </div>
                     """, unsafe_allow_html=True)
         
-        with col8:
+        with col8, spans.span("dashboard.insights"):
             st.markdown("#### Key Insights")
-            peak_hour = df[df['missed'] == 1]['Hour_of_Day'].mode().iloc[0] if not df[df['missed'] == 1].empty else None
-            task_types = df.groupby('Task_Type')['missed'].mean().sort_values(ascending=False) if 'Task_Type' in df.columns else pd.Series()
-            high_risk_type = task_types.index[0] if not task_types.empty else "Unknown"
+            key_insights = backend.insights()
+            peak_hour = key_insights['peak_hour']
+            high_risk_type = key_insights['high_risk_type']
             
-            weekend_completion = df[df['Weekend'] == 1]['Task_Status'].eq('Completed').mean() * 100
-            weekday_completion = df[df['Weekend'] == 0]['Task_Status'].eq('Completed').mean() * 100
+            weekend_completion = key_insights['weekend_completion']
+            weekday_completion = key_insights['weekday_completion']
             
             st.markdown(f"""
             <div class='custom-card'>
@@ -414,14 +414,9 @@ if df is not None:
             </div>
             """, unsafe_allow_html=True)
 
-    elif st.session_state.current_page == "Visualization":
-        # Import and run the visualization page content
-        import pages.visualization
-        
-    elif st.session_state.current_page == "Prediction":
-        # Import and run the prediction page content
-        import pages.prediction
-        
-    elif st.session_state.current_page == "To-Do List":
-        # Import and run the to-do list page content
-        import pages.todo 
\ No newline at end of file
+    elif st.session_state.current_page in PAGES:
+        # Render the page on every rerun; its module is imported on first visit
+        with spans.span(f"page.{PAGES[st.session_state.current_page]}"):
+            render_page(st.session_state.current_page)
+
+spans.debug_panel()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from page_registry import PAGES  # noqa: E402
+
+# Cold-start import report: imports the app's modules and each registered
+# page in a fresh interpreter under `python -X importtime`, so nothing is
+# cached between targets, and lists the wall time, the slowest imports and
+# which heavy libraries each one pulled in. Run from the repository root:
+#
+#     python benchmarks/imports.py
+#     python benchmarks/imports.py --top 20
+
+# Modules imported by app.py before any page is visited
+APP_MODULES = ['streamlit', 'pandas', 'plotly.express', 'plotly.graph_objects', 'numpy',
+               'data_loader', 'downsample', 'page_registry', 'query_backend', 'rollups', 'spans']
+# Libraries that should only be imported when a page actually needs them
+HEAVY_MODULES = ['xgboost', 'shap', 'sklearn', 'matplotlib', 'seaborn', 'duckdb']
+
+SCRIPT = """
+import sys, time
+sys.stderr.write("START\\n")
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print("TOTAL", time.perf_counter() - start)
+print("HEAVY", " ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+# Import `modules` in a fresh interpreter after `preload`. Returns (seconds,
+# heavy libraries loaded, [(cumulative seconds, module)] for the imports made
+# after the preload).
+def measure(modules, preload=()):
+    script = "".join(f"import {name}\n" for name in preload) + SCRIPT.format(
+        modules=list(modules), heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=REPO_ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    seconds, heavy = 0.0, []
+    for line in result.stdout.splitlines():
+        if line.startswith("TOTAL"):
+            seconds = float(line.split()[1])
+        elif line.startswith("HEAVY"):
+            heavy = line.split()[1:]
+    # stderr lines: "import time: self [us] | cumulative | imported package";
+    # only top-level imports (no indentation) are kept
+    imports = []
+    lines = result.stderr.splitlines()
+    for line in lines[lines.index("START") + 1:]:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            imports.append((int(cumulative) / 1e6, name.strip()))
+    return seconds, heavy, sorted(imports, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import times of the app and its pages")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports listed per target")
+    args = parser.parse_args()
+
+    # pages are measured on top of the app's modules, as when first visited
+    targets = [("app", APP_MODULES, ())]
+    targets += [(f"page {name}", [module], APP_MODULES) for name, module in PAGES.items()]
+    for label, modules, preload in targets:
+        seconds, heavy, imports = measure(modules, preload)
+        print(f"{label}: {seconds:.2f}s, heavy libraries: {', '.join(heavy) or 'none'}")
+        for cumulative, name in imports[:args.top]:
+            print(f"    {cumulative:7.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import build_features, encode_categoricals  # noqa: E402
+from model_bundle import BUNDLE_PATH, load_bundle  # noqa: E402
+from scoring import predict_encoded, to_model_array  # noqa: E402
+
+# Compares the original Prediction page path (DataFrame + LabelEncoder.transform
+# + XGBClassifier.predict + predict_proba) with the native booster path on
+# pre-encoded NumPy arrays. Run from the repository root:
+#
+#     python benchmarks/inference.py --sizes 1 100 100000
+
+DEFAULT_SIZES = [1, 100, 100_000]
+
+
+# Random raw task records with the fields collected by the prediction form
+def random_task_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    scheduled = pd.Timestamp("2025-01-06") + pd.to_timedelta(rng.integers(0, 7 * 24 * 60, n), unit="min")
+    actual_start = scheduled + pd.to_timedelta(rng.integers(0, 120, n), unit="min")
+    return pd.DataFrame({
+        'Facility_ID': rng.integers(1, 6, n),
+        'Task_Type': rng.choice(["Maintenance", "Cleaning", "Inspection", "Repair", "Other"], n),
+        'Priority': rng.choice(["High", "Medium", "Low"], n),
+        'Time_Slot': rng.choice(["Morning", "Afternoon", "Evening", "Night"], n),
+        'Task_Frequency': rng.integers(1, 8, n),
+        'Workload_Estimate': rng.uniform(0.5, 8.0, n),
+        'Delay_Duration': rng.integers(0, 240, n),
+        'Previous_Task_Delay': rng.integers(0, 240, n),
+        'Rolling_Avg_Delay': rng.integers(0, 240, n),
+        'Scheduled_Time': scheduled,
+        'Actual_Start_Time': actual_start,
+        'Actual_Completion_Time': actual_start + pd.to_timedelta(rng.integers(10, 480, n), unit="min"),
+    })
+
+
+# The path used before the fast API: encode with the pickled LabelEncoders,
+# then call the sklearn wrapper twice
+def legacy_predict(model, encoders, features):
+    df = features.copy()
+    for column, encoder in encoders.items():
+        df[column] = encoder.transform(df[column])
+    return model.predict(df), model.predict_proba(df)[:, 1]
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-row and batch inference paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--bundle", default=BUNDLE_PATH)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    encoders = {
+        'Task_Type': joblib.load(os.path.join('models', 'task_type_encoder.pkl')),
+        'Priority': joblib.load(os.path.join('models', 'priority_encoder.pkl')),
+        'Time_Slot': joblib.load(os.path.join('models', 'time_slot_encoder.pkl'))
+    }
+
+    print(f"{'rows':>8} {'legacy ms':>12} {'fast ms':>12} {'legacy us/row':>14} {'fast us/row':>12} {'speedup':>8}")
+    for size in args.sizes:
+        features = build_features(random_task_records(size))
+        X = to_model_array(encode_categoricals(features, bundle.vocabularies))
+        repeat = 3 if size >= 10_000 else 50
+
+        labels, probabilities = predict_encoded(bundle.booster, X)
+        legacy_labels, legacy_probabilities = legacy_predict(bundle.model, encoders, features)
+        assert np.array_equal(labels, legacy_labels)
+        assert np.allclose(probabilities, legacy_probabilities)
+
+        legacy = best_time(lambda: legacy_predict(bundle.model, encoders, features), repeat)
+        fast = best_time(lambda: predict_encoded(bundle.booster, X), repeat)
+        print(f"{size:>8} {legacy * 1e3:>12.3f} {fast * 1e3:>12.3f} "
+              f"{legacy / size * 1e6:>14.2f} {fast / size * 1e6:>12.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
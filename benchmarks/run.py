@@ -0,0 +1,373 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_data  # noqa: E402
+import partitions  # noqa: E402
+import query_backend  # noqa: E402
+import rollups  # noqa: E402
+import shap_analysis  # noqa: E402
+from data_loader import IncrementalLoader  # noqa: E402
+from features import model_matrix  # noqa: E402
+from inference import random_task_records  # noqa: E402
+from model_bundle import BUNDLE_PATH, load_bundle  # noqa: E402
+from scoring import predict_encoded, score_records, to_model_array  # noqa: E402
+from task_index import TaskIndex  # noqa: E402
+
+# Benchmarks the dashboard's hot paths on synthetic data of several sizes,
+# recording wall time (best of --repeat runs) and peak traced memory (one
+# extra run under tracemalloc; memory allocated inside native libraries such
+# as XGBoost is not traced). Run from the repository root:
+#
+#     python benchmarks/run.py --sizes 10000 1000000 --output results.json
+#     python benchmarks/run.py --save-baseline              # store a baseline
+#     python benchmarks/run.py                              # compare with it
+#
+# Generated datasets are kept in benchmarks/.data and reused between runs.
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Relative slowdown (or memory growth) over the baseline reported as a regression
+DEFAULT_THRESHOLD = 0.2
+# Differences below these are noise whatever the ratio
+MIN_SECONDS = 0.01
+MIN_PEAK_MB = 1.0
+# Most rows explained / scored by the SHAP and batch prediction cases
+SHAP_SAMPLE_SIZE = 500
+MAX_BATCH_ROWS = 1_000_000
+
+
+# Synthetic source CSV with `rows` rows, generated once
+def dataset(rows):
+    path = os.path.join(DATA_DIR, f"tasks_{rows}.csv")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        generate_data.generate(rows, path, days=max(30, min(730, rows // 2000)))
+    return path
+
+
+# The same synthetic tasks as a month=YYYY-MM partitioned Parquet dataset
+def parquet_dataset(rows):
+    path = os.path.join(DATA_DIR, f"tasks_{rows}")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        generate_data.generate(rows, path, 'parquet', days=max(30, min(730, rows // 2000)))
+    return path
+
+
+# Lazily built inputs shared by the cases of one dataset size
+class Context:
+    def __init__(self, rows, bundle_path):
+        self.rows = rows
+        self.bundle_path = bundle_path
+        self.path = dataset(rows)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self._values = {}
+
+    def close(self):
+        self.cache_dir.cleanup()
+
+    def get(self, name, build):
+        if name not in self._values:
+            self._values[name] = build()
+        return self._values[name]
+
+    @property
+    def frame(self):
+        def build():
+            with tempfile.TemporaryDirectory() as cache_dir:
+                loader = IncrementalLoader(self.path, cache_dir)
+                loader.refresh()
+                return loader.frame
+        return self.get('frame', build)
+
+    @property
+    def rollup(self):
+        return self.get('rollup', lambda: rollups.build_rollup(self.frame))
+
+    @property
+    def index(self):
+        return self.get('index', lambda: TaskIndex(self.frame))
+
+    @property
+    def duckdb(self):
+        return self.get('duckdb', lambda: query_backend.DuckDBBackend(parquet_dataset(self.rows)).refresh())
+
+    @property
+    def bundle(self):
+        return self.get('bundle', lambda: load_bundle(self.bundle_path))
+
+    @property
+    def records(self):
+        return self.get('records', lambda: random_task_records(min(self.rows, MAX_BATCH_ROWS)))
+
+
+# ------------- Cases: each takes a Context and returns the timed callable -------------
+
+def load_cold(ctx):
+    def run():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            IncrementalLoader(ctx.path, cache_dir).refresh()
+    return run
+
+
+def load_warm(ctx):
+    cache_dir = ctx.cache_dir.name
+    IncrementalLoader(ctx.path, cache_dir).refresh()
+    return lambda: IncrementalLoader(ctx.path, cache_dir).refresh()
+
+
+# Reads of the partitioned Parquet copy: all of it, and one month window
+def load_partitioned(ctx):
+    source = parquet_dataset(ctx.rows)
+    return lambda: partitions.read_partitioned(source)
+
+
+def load_partitioned_month(ctx):
+    source = parquet_dataset(ctx.rows)
+    last = partitions.dataset_bounds(source)[1]
+    return lambda: partitions.read_partitioned(source, last - pd.Timedelta(days=30), last)
+
+
+def rollup_build(ctx):
+    frame = ctx.frame
+    return lambda: rollups.build_rollup(frame)
+
+
+def dashboard_kpis(ctx):
+    rollup = ctx.rollup
+
+    def run():
+        rollups.totals(rollup)
+        rollups.status_counts_on(rollup, rollup['date'].iloc[-1])
+        rollups.daily_trend(rollup)
+        rollups.insights(rollup)
+    return run
+
+
+def heatmap(ctx):
+    rollup = ctx.rollup
+    days = list(range(1, 6))
+    return lambda: rollups.heatmap_counts(rollup, days=days, hours=list(range(24)), task_type='Repair')
+
+
+def heatmap_raw_pivot(ctx):
+    frame = ctx.frame
+    return lambda: frame.pivot_table(index='Day_of_Month', columns='Hour_of_Day', values='missed',
+                                     aggfunc='count', fill_value=0, observed=True)
+
+
+def index_build(ctx):
+    frame = ctx.frame
+    return lambda: TaskIndex(frame)
+
+
+def sidebar_filters(ctx):
+    index = ctx.index
+    start = index.times[len(index.times) // 4]
+    end = index.times[3 * len(index.times) // 4]
+    return lambda: index.positions(start, end, Task_Status=['Missed', 'Delayed'],
+                                   Task_Type=['Repair', 'Cleaning', 'Other'])
+
+
+def sidebar_filters_pandas(ctx):
+    frame = ctx.frame
+    start = frame['date'].iloc[len(frame) // 4]
+    end = frame['date'].iloc[3 * len(frame) // 4]
+
+    def run():
+        mask = (frame['date'] >= start) & (frame['date'] <= end)
+        mask &= frame['Task_Status'].isin(['Missed', 'Delayed'])
+        mask &= frame['Task_Type'].isin(['Repair', 'Cleaning', 'Other'])
+        return np.flatnonzero(mask.to_numpy())
+    return run
+
+
+def shap_block(ctx):
+    frame = ctx.frame
+    features = ['Facility_ID', 'Hour_of_Day', 'Day_of_Week', 'Day_of_Month']
+
+    def run():
+        job = shap_analysis.ShapJob(None, features, SHAP_SAMPLE_SIZE, shap_analysis.DEFAULT_MAX_TRAIN_ROWS)
+        job.run(lambda: (frame[features], frame['missed']))
+        if job.error is not None:
+            raise RuntimeError(job.error)
+    return run
+
+
+# The Dashboard and Visualization queries on DuckDB over Parquet; each run
+# uses a fresh backend so no query result is reused
+def duckdb_kpis(ctx):
+    source = ctx.duckdb.source
+
+    def run():
+        backend = query_backend.DuckDBBackend(source).refresh()
+        backend.totals()
+        backend.status_counts_on(backend.date_bounds()[1])
+        backend.daily_trend()
+        backend.insights()
+    return run
+
+
+def duckdb_filters(ctx):
+    source = ctx.duckdb.source
+    first, last = ctx.duckdb.date_bounds()
+    filters = dict(start=first + (last - first) / 4, end=first + 3 * (last - first) / 4,
+                   statuses=['Missed', 'Delayed'], task_types=['Repair', 'Cleaning', 'Other'])
+
+    def run():
+        backend = query_backend.DuckDBBackend(source).refresh()
+        backend.totals(**filters)
+        backend.heatmap_counts(days=list(range(1, 6)), task_type='Repair', **filters)
+        backend.weekend_status(**filters)
+    return run
+
+
+def predict_single(ctx):
+    booster = ctx.bundle.booster
+    X = to_model_array(model_matrix(ctx.records.iloc[:1], ctx.bundle.vocabularies))
+    return lambda: predict_encoded(booster, X)
+
+
+def predict_batch(ctx):
+    bundle = ctx.bundle
+    records = ctx.records
+    return lambda: score_records(bundle.booster, records, bundle.vocabularies)
+
+
+CASES = {
+    'load_cold': load_cold,
+    'load_warm': load_warm,
+    'load_partitioned': load_partitioned,
+    'load_partitioned_month': load_partitioned_month,
+    'rollup_build': rollup_build,
+    'dashboard_kpis': dashboard_kpis,
+    'heatmap': heatmap,
+    'heatmap_raw_pivot': heatmap_raw_pivot,
+    'index_build': index_build,
+    'sidebar_filters': sidebar_filters,
+    'sidebar_filters_pandas': sidebar_filters_pandas,
+    'duckdb_kpis': duckdb_kpis,
+    'duckdb_filters': duckdb_filters,
+    'shap_block': shap_block,
+    'predict_single': predict_single,
+    'predict_batch': predict_batch,
+}
+
+
+def measure(fn, repeat):
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), peak / 2 ** 20
+
+
+def environment():
+    import xgboost as xgb
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgb.__version__,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run_suite(sizes, cases, repeat, bundle_path, on_result=None):
+    results = []
+    for rows in sizes:
+        ctx = Context(rows, bundle_path)
+        try:
+            for name in cases:
+                fn = CASES[name](ctx)
+                # large datasets get fewer timed runs
+                seconds, peak_mb = measure(fn, repeat if rows < 1_000_000 else 1)
+                result = {'case': name, 'rows': rows, 'seconds': seconds, 'peak_mb': peak_mb}
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        finally:
+            ctx.close()
+    return results
+
+
+# Results slower or hungrier than the baseline by more than `threshold`
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    previous = {(r['case'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['case'], result['rows']))
+        if before is None:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+            if result[metric] - before[metric] > max(floor, threshold * before[metric]):
+                regressions.append((result['case'], result['rows'], metric, before[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard hot paths on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bundle", default=os.path.join(REPO_ROOT, BUNDLE_PATH))
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    print(f"{'case':<24} {'rows':>10} {'seconds':>10} {'peak MB':>10}")
+
+    def report(result):
+        print(f"{result['case']:<24} {result['rows']:>10} {result['seconds']:>10.4f} {result['peak_mb']:>10.1f}",
+              flush=True)
+
+    report_data = {'environment': environment(),
+                   'results': run_suite(args.sizes, args.cases, args.repeat, args.bundle, report)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report_data, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report_data, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report_data['results'], baseline, args.threshold)
+        for case, rows, metric, before, after in regressions:
+            print(f"REGRESSION {case} @ {rows} rows: {metric} {before:.4f} -> {after:.4f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
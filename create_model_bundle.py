@@ -0,0 +1,19 @@
+import joblib
+import os
+
+from model_bundle import BUNDLE_PATH, build_bundle, save_bundle
+
+# Load the separately pickled model and label encoders
+model = joblib.load(os.path.join('models', 'xgb_model.pkl'))
+vocabularies = {
+    'Task_Type': joblib.load(os.path.join('models', 'task_type_encoder.pkl')),
+    'Priority': joblib.load(os.path.join('models', 'priority_encoder.pkl')),
+    'Time_Slot': joblib.load(os.path.join('models', 'time_slot_encoder.pkl'))
+}
+
+# The feature schema comes from features.MODEL_FEATURES (the order the booster
+# was trained on); models/feature_names.pkl lists a different, older schema
+bundle = build_bundle(model, vocabularies, metadata={'source': 'xgb_model.pkl'})
+save_bundle(bundle, BUNDLE_PATH)
+
+print(f"Model bundle {bundle['version']} has been saved to '{BUNDLE_PATH}'")
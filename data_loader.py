@@ -0,0 +1,353 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features import add_calendar_features
+
+# Source dataset read by the dashboard pages
+DATA_PATH = "facility_tasks (2).csv"
+SOURCE_ENCODING = "ISO-8859-1"
+
+# Directory holding the columnar copy of the cleaned dataset
+CACHE_DIR = ".cache"
+
+# Bump when the layout of the cached copy changes
+CACHE_VERSION = 4
+
+# Size of the blocks read when hashing the already-ingested bytes
+HASH_BLOCK = 1 << 20
+
+# Appended parts are merged into one file once there are this many
+MAX_PARTS = 32
+
+# Low-cardinality text columns held as pandas categoricals
+CATEGORY_COLUMNS = ['Task_Type', 'Task_Status', 'Priority', 'Assignee', 'Time_Slot']
+
+
+# Check whether a Parquet engine is installed
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Cheap fingerprint of the source file (modification time and size)
+def file_stat(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+# SHA-256 of the first `offset` bytes of the file, read in 1 MiB blocks. If
+# it changed, the file was edited or rewritten rather than appended to. The
+# hashlib object is returned so the bytes after `offset` can be added to it.
+def prefix_hash(path, offset, block_size=HASH_BLOCK):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while offset > 0:
+            block = f.read(min(block_size, offset))
+            if not block:
+                break
+            digest.update(block)
+            offset -= len(block)
+    return digest
+
+
+# Parse raw CSV bytes into a frame with a typed Timestamp column
+def parse_csv(data, names=None):
+    if names is None:
+        df = pd.read_csv(io.BytesIO(data), encoding=SOURCE_ENCODING)
+        df.columns = df.columns.str.strip()
+    else:
+        df = pd.read_csv(io.BytesIO(data), encoding=SOURCE_ENCODING,
+                         header=None, names=names)
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    return df
+
+
+# Parse the whole source file
+def read_source(path=DATA_PATH):
+    with open(path, "rb") as f:
+        return parse_csv(f.read())
+
+
+# Add the derived columns used across the dashboard pages and convert the
+# frame to its compact in-memory schema: categorical text columns, `date` as
+# a datetime64 day (midnight), and int8 flags and calendar fields
+def derive_columns(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    df['date'] = df['Timestamp'].dt.normalize()
+    df['missed'] = (df['Task_Status'].astype(str).str.lower() == "missed").astype(np.int8)
+    return add_calendar_features(df, 'Timestamp')
+
+
+# Concatenate frames row-wise, keeping categorical columns categorical by
+# unioning their categories first (a plain concat falls back to object)
+def concat_frames(frames):
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) == 1:
+        return frames[0]
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            categories = pd.api.types.union_categoricals(
+                [frame[column] for frame in frames if column in frame.columns]).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)})
+                      if column in frame.columns else frame for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+# Deep memory usage per column, in bytes
+def memory_usage(df):
+    return df.memory_usage(deep=True, index=False)
+
+
+# Memory of the task frame in the previous representation (object strings,
+# Python date objects, int64 flags) next to the compact schema
+def memory_report(path=DATA_PATH):
+    compact = derive_columns(read_source(path))
+    legacy = compact.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in legacy.columns:
+            legacy[column] = legacy[column].astype(object)
+    legacy['date'] = legacy['Timestamp'].dt.date
+    for column in ['missed', 'Hour_of_Day', 'Day_of_Week', 'Weekend', 'Day_of_Month']:
+        legacy[column] = legacy[column].astype(np.int64)
+    report = pd.DataFrame({'before_bytes': memory_usage(legacy), 'after_bytes': memory_usage(compact)})
+    report.loc['total'] = report.sum()
+    report['ratio'] = (report['before_bytes'] / report['after_bytes']).round(1)
+    return report
+
+
+# Paths of the Parquet parts directory and its metadata for a source file
+def cache_paths(path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return (os.path.join(cache_dir, stem),
+            os.path.join(cache_dir, f"{stem}.meta.json"))
+
+
+# Read a JSON sidecar file, or None if it is missing or unreadable
+def read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# Atomically replace a JSON sidecar file
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _write_part(df, parts_dir, name):
+    part_path = os.path.join(parts_dir, name)
+    df.to_parquet(part_path + ".tmp", index=False)
+    os.replace(part_path + ".tmp", part_path)
+
+
+# Loads the task dataset once, then ingests only rows appended to the source
+# file since the last refresh. The watermark is the byte offset of the last
+# complete line parsed, with the hash of every byte before it; both are
+# persisted alongside the Parquet parts so a restarted process also resumes
+# from them. When the file changes, its prefix is hashed again (a sequential
+# read, far cheaper than parsing) and any edit before the watermark forces a
+# full rebuild. Appenders must write whole, newline-terminated rows; when
+# ingesting appended bytes, a trailing partial line is held back and picked
+# up once complete. A full (re)load reads the last line even without a final
+# newline, as exported CSVs often lack one, and marks the watermark: if the
+# next append does not start a new line, that row was still being written
+# and the file is rebuilt.
+class IncrementalLoader:
+    def __init__(self, path=DATA_PATH, cache_dir=CACHE_DIR):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.frame = None
+        self.meta = None
+        self.listeners = []
+        self._persist = parquet_available()
+        self._parts_dir, self._meta_path = cache_paths(path, cache_dir)
+        self._lock = threading.Lock()
+
+    # Identifier of the data currently loaded; changes whenever rows are
+    # ingested or the file is rebuilt
+    @property
+    def version(self):
+        if self.meta is None:
+            return None
+        return f"{self.meta['offset']}-{self.meta['prefix_hash'][:12]}"
+
+    # Register a callback(rows, rebuilt) receiving each batch of newly
+    # ingested rows, or the full frame with rebuilt=True after a reload, so
+    # aggregates stay in step with the frame
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    # Bring the frame up to date with the source file and return the rows
+    # that were added (the whole frame after a full rebuild)
+    def refresh(self):
+        with self._lock:
+            return self._refresh()
+
+    # Bring the frame up to date, then return read(frame, version) computed
+    # before any other refresh can run, so everything derived from the frame
+    # (rollup, index) belongs to the same version of the data
+    def snapshot(self, read):
+        with self._lock:
+            self._refresh()
+            return read(self.frame, self.version)
+
+    def _refresh(self):
+        stat = file_stat(self.path)
+        if self.frame is None:
+            self._restore()
+
+        meta = self.meta
+        if meta is not None:
+            if meta["mtime_ns"] == stat["mtime_ns"] and meta["size"] == stat["size"]:
+                return self.frame.iloc[0:0]
+            if stat["size"] >= meta["offset"]:
+                digest = prefix_hash(self.path, meta["offset"])
+                if digest.hexdigest() == meta["prefix_hash"]:
+                    return self._ingest_tail(stat, digest)
+        return self._rebuild(stat)
+
+    # Reload the frame and watermark written by a previous process
+    def _restore(self):
+        if not self._persist:
+            return
+        meta = read_json(self._meta_path)
+        if meta is None or meta.get("version") != CACHE_VERSION:
+            return
+        try:
+            parts = [pd.read_parquet(os.path.join(self._parts_dir, name))
+                     for name in meta["parts"]]
+        except (FileNotFoundError, OSError):
+            return
+        self.frame = concat_frames(parts)
+        self.meta = meta
+
+    # Parse the rows after the watermark; `digest` is the hash of the bytes
+    # before it, extended with the rows taken
+    def _ingest_tail(self, stat, digest):
+        meta = self.meta
+        with open(self.path, "rb") as f:
+            f.seek(meta["offset"])
+            data = f.read(stat["size"] - meta["offset"])
+        if meta["unterminated"] and data and not data.startswith((b"\n", b"\r\n")):
+            # the last row of the previous load was only partly written
+            return self._rebuild(stat)
+        end = data.rfind(b"\n") + 1
+        new_rows = self.frame.iloc[0:0]
+        if data[:end].strip():
+            new_rows = derive_columns(parse_csv(data[:end], names=meta["header"]))
+            start = len(self.frame)
+            new_rows.index = pd.RangeIndex(start, start + len(new_rows))
+            self.frame = concat_frames([self.frame, new_rows])
+
+        digest.update(data[:end])
+        meta = {**meta, **stat, "offset": meta["offset"] + end, "rows": len(self.frame),
+                "prefix_hash": digest.hexdigest(), "unterminated": meta["unterminated"] and not end}
+        if len(new_rows):
+            meta["last_timestamp"] = str(self.frame['Timestamp'].iloc[-1])
+        if self._persist:
+            if len(new_rows):
+                if len(meta["parts"]) >= MAX_PARTS:
+                    meta["parts"] = self._write_parts(self.frame)
+                else:
+                    name = f"part-{meta['next_part']:05d}.parquet"
+                    _write_part(new_rows, self._parts_dir, name)
+                    meta["parts"] = meta["parts"] + [name]
+                    meta["next_part"] += 1
+            write_json(self._meta_path, meta)
+        self.meta = meta
+
+        if len(new_rows):
+            for callback in self.listeners:
+                callback(new_rows, False)
+        return new_rows
+
+    def _rebuild(self, stat):
+        with open(self.path, "rb") as f:
+            data = f.read(stat["size"])
+        end = data.rfind(b"\n") + 1
+        # Without a trailing newline the last row is taken as complete
+        unterminated = bool(data[end:].strip())
+        if unterminated:
+            end = len(data)
+
+        # published only once the derived columns are in place
+        frame = parse_csv(data[:end])
+        header = list(frame.columns)
+        derive_columns(frame)
+        meta = {"version": CACHE_VERSION, **stat, "header": header,
+                "offset": end, "rows": len(frame),
+                "prefix_hash": hashlib.sha256(data[:end]).hexdigest(), "unterminated": unterminated,
+                "last_timestamp": str(frame['Timestamp'].iloc[-1]) if len(frame) else None,
+                "parts": [], "next_part": 1}
+        if self._persist:
+            meta["parts"] = self._write_parts(frame)
+            write_json(self._meta_path, meta)
+        self.frame = frame
+        self.meta = meta
+
+        for callback in self.listeners:
+            callback(self.frame, True)
+        return self.frame
+
+    # Replace all parts with a single file holding `df`
+    def _write_parts(self, df):
+        if os.path.isdir(self._parts_dir):
+            shutil.rmtree(self._parts_dir)
+        os.makedirs(self._parts_dir)
+        _write_part(df, self._parts_dir, "part-00000.parquet")
+        return ["part-00000.parquet"]
+
+
+# Load the cleaned task frame, reusing the Parquet copy when the source file
+# is unchanged and parsing only the appended tail when it has grown
+def load_tasks(path=DATA_PATH, cache_dir=CACHE_DIR):
+    loader = IncrementalLoader(path, cache_dir)
+    loader.refresh()
+    return loader.frame
+
+
+_shared_loaders = {}
+_shared_lock = threading.Lock()
+
+
+# Process-wide loader for a source file, shared by every page and session
+def shared_loader(path=DATA_PATH, cache_dir=CACHE_DIR):
+    key = (os.path.abspath(path), os.path.abspath(cache_dir))
+    with _shared_lock:
+        if key not in _shared_loaders:
+            _shared_loaders[key] = IncrementalLoader(path, cache_dir)
+        return _shared_loaders[key]
+
+
+# Current task frame from the shared loader, after ingesting any new rows
+def current_tasks(path=DATA_PATH, cache_dir=CACHE_DIR):
+    loader = shared_loader(path, cache_dir)
+    loader.refresh()
+    return loader.frame
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report memory use of the task frame before and after the compact schema")
+    parser.add_argument("path", nargs="?", default=DATA_PATH)
+    args = parser.parse_args()
+    report = memory_report(args.path)
+    print(report.to_string())
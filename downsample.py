@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Approximate rendered widths of full-width and half-width (two-column)
+# charts in the wide page layout
+FULL_CHART_WIDTH = 1200
+HALF_CHART_WIDTH = 600
+# Screen pixels per plotted point; denser series carry no visible detail
+PIXELS_PER_POINT = 3
+# Buckets tried in order when a series has more points than fit: pandas
+# frequency, name, and approximate length in days
+FREQUENCIES = [('D', "day", 1), ('W-MON', "week", 7), ('MS', "month", 30.4)]
+# Series longer than this are drawn as plain lines, without markers
+MARKER_LIMIT = 120
+
+
+# Points a chart `width_px` wide can usefully show
+def max_points(width_px):
+    return max(2, int(width_px) // PIXELS_PER_POINT)
+
+
+# Largest-Triangle-Three-Buckets: positions of `threshold` points of (x, y)
+# that keep the visual shape of the line (first and last are always kept)
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        average_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        average_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+        areas = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+# Sum a per-date frame into the finest of day/week/month buckets that fits
+# in `limit` points. Returns the aggregated frame and the bucket name.
+def reaggregate(frame, date_column, value_columns, limit):
+    dates = pd.to_datetime(frame[date_column])
+    span_days = (dates.max() - dates.min()).days + 1 if len(frame) else 0
+    for frequency, name, days in FREQUENCIES:
+        if span_days / days <= limit:
+            break
+    if frequency == 'D':
+        return frame, name
+    grouped = (frame.assign(**{date_column: dates}).set_index(date_column)[value_columns]
+               .resample(frequency, label='left', closed='left').sum())
+    return grouped.reset_index(), name
+
+
+# Chart-ready version of a per-date series for a chart `width_px` wide:
+# re-aggregated to weeks or months for long ranges, then LTTB-thinned if it
+# still has more points than pixels allow. Positions kept for any value
+# column are kept for all, so the lines share their x values.
+def downsample_series(frame, date_column, value_columns, width_px):
+    limit = max_points(width_px)
+    frame, bucket = reaggregate(frame, date_column, value_columns, limit)
+    if len(frame) > limit:
+        x = pd.to_datetime(frame[date_column]).to_numpy().astype('datetime64[s]').astype(np.int64)
+        keep = np.unique(np.concatenate([
+            lttb(x, frame[column].to_numpy(), max(3, limit // len(value_columns)))
+            for column in value_columns
+        ]))
+        frame = frame.iloc[keep]
+    return frame.reset_index(drop=True), bucket
+
+
+# Plotly trace mode for a series of `points` points
+def line_mode(points):
+    return "markers+lines" if points <= MARKER_LIMIT else "lines"
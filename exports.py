@@ -0,0 +1,81 @@
+import gzip
+import io
+import tempfile
+
+from data_loader import parquet_available
+
+# Rows serialized per step of an export
+EXPORT_CHUNK_ROWS = 100_000
+
+# Download formats: file extension and MIME type
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+# Formats that can be produced in this environment
+def available_formats():
+    return [name for name in EXPORT_FORMATS if name != "Parquet" or parquet_available()]
+
+
+# Write the frames yielded by `chunks` to the binary file `out` as one CSV
+# (plain or gzip) or Parquet file, one chunk at a time
+def write_chunks(chunks, export_format, out):
+    if export_format == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema, compression="zstd")
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+        return
+
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'")
+    binary = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) if export_format == "CSV (gzip)" else out
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(text, index=False, header=header)
+        header = False
+    text.flush()
+    text.detach()
+    if binary is not out:
+        binary.close()
+
+
+# Chunks of the rows of `frame` at `positions`, taken one slice at a time
+def frame_chunks(frame, positions, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(positions), chunk_rows):
+        yield frame.iloc[positions[start:start + chunk_rows]]
+    if len(positions) == 0:
+        yield frame.iloc[:0]
+
+
+# Export of the rows of `frame` at `positions`, written chunk by chunk to an
+# anonymous temporary file and returned rewound, for st.download_button to
+# read when the download is served; no copy of the export is kept in memory
+# here. The file is unbuffered (a raw FileIO), one of the file types the
+# button accepts, and is removed once closed. Meant to run only when a
+# download is requested, as a deferred st.download_button callable.
+def export_rows(frame, positions, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    out = tempfile.TemporaryFile(buffering=0)
+    try:
+        write_chunks(frame_chunks(frame, positions, chunk_rows), export_format, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+# File name for an export of `stem` in `export_format`
+def export_file_name(stem, export_format):
+    return stem + EXPORT_FORMATS[export_format][0]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# Model input columns, in the order the booster was trained on
+MODEL_FEATURES = [
+    'Facility_ID', 'Task_Type', 'Priority', 'Delay_Duration', 'Actual_Duration',
+    'Workload_Estimate', 'Day_of_Week', 'Time_Slot', 'Task_Frequency', 'Hour_of_Day',
+    'Week_of_Year', 'Day_of_Month', 'Weekend', 'Previous_Task_Delay', 'Rolling_Avg_Delay',
+    'Scheduled_Year', 'Scheduled_Month', 'Scheduled_Day', 'Scheduled_Weekday',
+    'Actual_Start_Hour', 'Actual_Completion_Hour', 'Start_Duration'
+]
+
+# Features label-encoded before they reach the model
+CATEGORICAL_FEATURES = ['Task_Type', 'Priority', 'Time_Slot']
+
+# Fields of a raw task record, as collected by the prediction form. The three
+# time fields accept full datetimes; the actual start/completion fields may
+# also be times of day on the scheduled date.
+RAW_FIELDS = [
+    'Facility_ID', 'Task_Type', 'Priority', 'Time_Slot', 'Task_Frequency',
+    'Workload_Estimate', 'Delay_Duration', 'Previous_Task_Delay', 'Rolling_Avg_Delay',
+    'Scheduled_Time', 'Actual_Start_Time', 'Actual_Completion_Time'
+]
+
+TIME_OF_DAY = r"\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?"
+
+
+# Calendar columns derived from a timestamp column, computed column-wise (int8)
+def add_calendar_features(df, column='Timestamp'):
+    timestamp = df[column].dt
+    df['Hour_of_Day'] = timestamp.hour.astype(np.int8)
+    df['Day_of_Week'] = timestamp.dayofweek.astype(np.int8)
+    df['Weekend'] = (df['Day_of_Week'] >= 5).astype(np.int8)
+    df['Day_of_Month'] = timestamp.day.astype(np.int8)
+    return df
+
+
+# Accept a DataFrame, a dict of arrays/lists, or a NumPy structured array
+def as_frame(batch):
+    if isinstance(batch, pd.DataFrame):
+        return batch
+    return pd.DataFrame(batch)
+
+
+# Resolve a time column to datetimes, placing bare times of day on the
+# corresponding scheduled date. The format is decided per row, as a batch
+# can mix records from different sources.
+def _combine_with_date(values, dates):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype(str)
+    time_only = text.str.fullmatch(TIME_OF_DAY)
+    resolved = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    if time_only.any():
+        times = text[time_only]
+        times = times.where(times.str.count(":") == 2, times + ":00")
+        resolved[time_only] = dates[time_only].dt.normalize() + pd.to_timedelta(times.to_numpy())
+    if not time_only.all():
+        resolved[~time_only] = pd.to_datetime(values[~time_only])
+    return resolved
+
+
+# Build the model features for a whole batch of raw task records. Returns a
+# frame with MODEL_FEATURES in model order; categorical columns are left as
+# labels (see encode_categoricals). A single prediction is a batch of one.
+def build_features(batch):
+    raw = as_frame(batch)
+    missing = [field for field in RAW_FIELDS if field not in raw.columns]
+    if missing:
+        raise ValueError(f"Missing task fields: {', '.join(missing)}")
+
+    scheduled = pd.to_datetime(raw['Scheduled_Time'])
+    actual_start = _combine_with_date(raw['Actual_Start_Time'], scheduled)
+    actual_completion = _combine_with_date(raw['Actual_Completion_Time'], scheduled)
+    weekday = scheduled.dt.dayofweek
+
+    features = pd.DataFrame({
+        'Facility_ID': raw['Facility_ID'].astype(np.int64),
+        'Task_Type': raw['Task_Type'],
+        'Priority': raw['Priority'],
+        'Delay_Duration': raw['Delay_Duration'].astype(np.float64),
+        'Actual_Duration': (actual_completion - actual_start).dt.total_seconds() / 60,
+        'Workload_Estimate': raw['Workload_Estimate'].astype(np.float64),
+        'Day_of_Week': weekday.astype(np.int64),
+        'Time_Slot': raw['Time_Slot'],
+        'Task_Frequency': raw['Task_Frequency'].astype(np.int64),
+        'Hour_of_Day': scheduled.dt.hour.astype(np.int64),
+        'Week_of_Year': scheduled.dt.isocalendar().week.astype(np.int64),
+        'Day_of_Month': scheduled.dt.day.astype(np.int64),
+        'Weekend': (weekday >= 5).astype(np.int64),
+        'Previous_Task_Delay': raw['Previous_Task_Delay'].astype(np.float64),
+        'Rolling_Avg_Delay': raw['Rolling_Avg_Delay'].astype(np.float64),
+        'Scheduled_Year': scheduled.dt.year.astype(np.int64),
+        'Scheduled_Month': scheduled.dt.month.astype(np.int64),
+        'Scheduled_Day': scheduled.dt.day.astype(np.int64),
+        'Scheduled_Weekday': weekday.astype(np.int64),
+        'Actual_Start_Hour': actual_start.dt.hour.astype(np.int64),
+        'Actual_Completion_Hour': actual_completion.dt.hour.astype(np.int64),
+        'Start_Duration': (actual_start - scheduled).dt.total_seconds() / 60,
+    }, index=raw.index)
+    return features[MODEL_FEATURES]
+
+
+# Replace categorical labels with their integer codes. `vocabularies` maps
+# each categorical feature to its ordered labels (a fitted LabelEncoder's
+# classes_ works too). Unknown labels raise ValueError, as LabelEncoder does.
+def encode_categoricals(features, vocabularies):
+    encoded = features.copy()
+    for column in CATEGORICAL_FEATURES:
+        labels = vocabularies[column]
+        labels = getattr(labels, 'classes_', labels)
+        codes = pd.Categorical(features[column], categories=labels).codes
+        if (codes < 0).any():
+            unknown = sorted(set(features[column][codes < 0].astype(str)))
+            raise ValueError(f"Unknown {column} label(s): {', '.join(unknown)}")
+        encoded[column] = codes.astype(np.int64)
+    return encoded
+
+
+# Encoded model matrix, in model column order, for a batch of raw records
+def model_matrix(batch, vocabularies):
+    return encode_categoricals(build_features(batch), vocabularies)
@@ -1,28 +1,229 @@
-import pandas as pd
+import argparse
+import os
+import shutil
+from multiprocessing import Pool
+
 import numpy as np
-from datetime import datetime, timedelta
-
-# Generate dates for the last 3 months
-end_date = datetime.now()
-start_date = end_date - timedelta(days=90)
-dates = pd.date_range(start=start_date, end=end_date, freq='H')
-
-# Generate synthetic data
-n_records = len(dates)
-data = {
-    'Timestamp': dates,
-    'Task_Name': [f'Task_{i}' for i in range(n_records)],
-    'Task_Type': np.random.choice(['Maintenance', 'Repair', 'Inspection', 'Cleaning', 'Safety Check'], n_records),
-    'Task_Status': np.random.choice(['Completed', 'In Progress', 'Missed', 'Scheduled'], n_records, p=[0.6, 0.2, 0.1, 0.1]),
-    'Workload_Estimate': np.random.uniform(1, 8, n_records),
-    'Task_Frequency': np.random.randint(1, 10, n_records),
-    'Priority': np.random.choice(['High', 'Medium', 'Low'], n_records),
-    'Assignee': np.random.choice(['John', 'Alice', 'Bob', 'Carol', 'David'], n_records)
-}
-
-# Create DataFrame
-df = pd.DataFrame(data)
-
-# Save to CSV
-df.to_csv('synthetic_facility_tasks_extended.csv', index=False)
-print("Synthetic data has been generated and saved to 'synthetic_facility_tasks_extended.csv'") 
\ No newline at end of file
+import pandas as pd
+
+from data_loader import DATA_PATH
+
+# Synthetic facility tasks in the schema of the dashboard's source file
+# (Timestamp, Facility_ID, Task_Type, Task_Status, Priority, Assignee), with
+# optional model input fields so the same rows can be scored on the
+# Prediction page. Generation is seeded and split into chunks of consecutive
+# days; each chunk has its own random stream, so the output is identical for
+# any number of worker processes. Examples:
+#
+#     python generate_data.py --rows 20000000 --workers 8
+#     python generate_data.py --rows 50000000 --format parquet --output data/tasks
+
+FACILITIES = [1, 2, 3, 4, 5]
+TASK_TYPES = ['Cleaning', 'Inspection', 'Maintenance', 'Other', 'Repair']
+PRIORITIES = ['High', 'Low', 'Medium']
+ASSIGNEES = ['Alice', 'John']
+STATUSES = ['Completed', 'Delayed', 'Missed']
+TIME_SLOTS = ['Afternoon', 'Evening', 'Morning', 'Night']
+SOURCE_COLUMNS = ['Timestamp', 'Facility_ID', 'Task_Type', 'Task_Status', 'Priority', 'Assignee']
+MODEL_COLUMNS = ['Time_Slot', 'Task_Frequency', 'Workload_Estimate', 'Delay_Duration',
+                 'Previous_Task_Delay', 'Rolling_Avg_Delay', 'Scheduled_Time',
+                 'Actual_Start_Time', 'Actual_Completion_Time']
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_DAYS = 365
+DEFAULT_START = "2024-01-01"
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Relative task volume per hour of day (busier during working hours) and per
+# weekday (Monday first; quieter on Sunday)
+HOURLY_VOLUME = np.array([0.6, 0.5, 0.5, 0.5, 0.6, 0.8, 1.0, 1.2, 1.4, 1.4, 1.3, 1.3,
+                          1.2, 1.3, 1.3, 1.2, 1.1, 1.0, 0.9, 0.9, 0.8, 0.7, 0.7, 0.6])
+WEEKDAY_VOLUME = np.array([0.95, 1.0, 1.02, 1.05, 1.03, 1.0, 0.85])
+
+# Log-odds of a task being missed / delayed rather than completed, and the
+# shifts applied per hour, weekend, priority, task type and facility
+MISSED_BASE, DELAYED_BASE = -1.9, -1.25
+HOURLY_MISS = 0.35 * np.sin((np.arange(24) - 4) / 24 * 2 * np.pi)
+WEEKEND_MISS = 0.1
+PRIORITY_MISS = {'High': -0.1, 'Low': 0.0, 'Medium': 0.05}
+TASK_TYPE_MISS = {'Cleaning': -0.15, 'Inspection': 0.05, 'Maintenance': 0.0, 'Other': 0.1, 'Repair': 0.0}
+FACILITY_MISS = {1: -0.05, 2: 0.0, 3: 0.05, 4: 0.1, 5: -0.1}
+
+
+# Number of tasks on each day: the weekly profile times a yearly cycle
+# (busier in spring and autumn), scaled to `rows` in total
+def daily_counts(rows, start, days, seed):
+    dates = pd.date_range(start, periods=days, freq='D')
+    weights = (WEEKDAY_VOLUME[dates.dayofweek.to_numpy()]
+               * (1 + 0.15 * np.cos(4 * np.pi * dates.dayofyear.to_numpy() / 365.25)))
+    rng = np.random.default_rng([seed, 0])
+    return dates, rng.multinomial(rows, weights / weights.sum())
+
+
+# Group consecutive days into chunks of about `chunk_rows` rows. Returns a
+# list of (chunk number, first day position, day counts).
+def plan_chunks(counts, chunk_rows):
+    chunks, first, total = [], 0, 0
+    for day, count in enumerate(counts):
+        total += count
+        if total >= chunk_rows or day == len(counts) - 1:
+            chunks.append((len(chunks), first, counts[first:day + 1]))
+            first, total = day + 1, 0
+    return chunks
+
+
+def choose(rng, values, size, p=None):
+    return np.asarray(values)[rng.choice(len(values), size=size, p=p)]
+
+
+# Time slot of each hour of day, as used by the prediction form
+def time_slots(hours):
+    slots = np.full(len(hours), 'Night', dtype=object)
+    slots[(hours >= 6) & (hours < 12)] = 'Morning'
+    slots[(hours >= 12) & (hours < 18)] = 'Afternoon'
+    slots[(hours >= 18) & (hours < 22)] = 'Evening'
+    return slots
+
+
+# Rows of one chunk of consecutive days, sorted by timestamp
+def generate_chunk(first_day, counts, start, seed, chunk, model_fields):
+    rng = np.random.default_rng([seed, 1, chunk])
+    n = int(counts.sum())
+    day_starts = pd.Timestamp(start) + pd.to_timedelta(first_day + np.arange(len(counts)), unit='D')
+    days = np.repeat(day_starts.to_numpy(), counts)
+    hours = rng.choice(24, size=n, p=HOURLY_VOLUME / HOURLY_VOLUME.sum())
+    seconds = hours * 3600 + rng.integers(0, 60, n) * 60
+    timestamps = days + seconds.astype('timedelta64[s]')
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, hours = timestamps[order], hours[order]
+
+    facility = choose(rng, FACILITIES, n)
+    task_type = choose(rng, TASK_TYPES, n)
+    priority = choose(rng, PRIORITIES, n, p=[0.325, 0.325, 0.35])
+    assignee = choose(rng, ASSIGNEES, n)
+    weekend = pd.DatetimeIndex(timestamps).dayofweek >= 5
+    workload = rng.gamma(4.0, 1.0, n).clip(0.5, 16)
+
+    shift = (HOURLY_MISS[hours] + WEEKEND_MISS * weekend
+             + pd.Series(priority).map(PRIORITY_MISS).to_numpy()
+             + pd.Series(task_type).map(TASK_TYPE_MISS).to_numpy()
+             + pd.Series(facility).map(FACILITY_MISS).to_numpy()
+             + 0.08 * (workload - 4))
+    missed_odds = np.exp(MISSED_BASE + shift)
+    delayed_odds = np.exp(DELAYED_BASE + 0.5 * shift)
+    draw = rng.random(n) * (1 + missed_odds + delayed_odds)
+    status = np.where(draw < 1, 0, np.where(draw < 1 + delayed_odds, 1, 2))
+
+    frame = pd.DataFrame({
+        'Timestamp': timestamps,
+        'Facility_ID': facility,
+        'Task_Type': task_type,
+        'Task_Status': np.asarray(STATUSES)[status],
+        'Priority': priority,
+        'Assignee': assignee,
+    })
+    if model_fields:
+        delay = np.where(status == 0, 0, rng.gamma(2.0, 30.0 * status, n)).round()
+        previous = rng.gamma(1.5, 20.0, n).round()
+        start_delay = pd.to_timedelta(rng.integers(0, 30, n) + delay, unit='min')
+        duration = pd.to_timedelta((workload * 30 + rng.integers(0, 60, n)).round(), unit='min')
+        frame['Time_Slot'] = time_slots(hours)
+        frame['Task_Frequency'] = rng.integers(1, 8, n)
+        frame['Workload_Estimate'] = workload.round(2)
+        frame['Delay_Duration'] = delay
+        frame['Previous_Task_Delay'] = previous
+        frame['Rolling_Avg_Delay'] = (0.7 * previous + 0.3 * delay).round(1)
+        frame['Scheduled_Time'] = timestamps
+        frame['Actual_Start_Time'] = frame['Scheduled_Time'] + start_delay
+        frame['Actual_Completion_Time'] = frame['Actual_Start_Time'] + duration
+    return frame
+
+
+# Worker: one chunk as CSV bytes (header excluded), so the parent only
+# concatenates output
+def csv_chunk(task):
+    chunk, first_day, counts, start, seed, model_fields = task
+    frame = generate_chunk(first_day, counts, start, seed, chunk, model_fields)
+    return frame.to_csv(index=False, header=False, date_format='%Y-%m-%d %H:%M:%S').encode('utf-8')
+
+
+# Worker: one chunk written as Parquet files under month=YYYY-MM partitions
+def parquet_chunk(task):
+    chunk, first_day, counts, start, seed, model_fields, output = task
+    frame = generate_chunk(first_day, counts, start, seed, chunk, model_fields)
+    months = frame['Timestamp'].dt.strftime('%Y-%m')
+    written = 0
+    for month, part in frame.groupby(months, sort=False):
+        directory = os.path.join(output, f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        part.to_parquet(os.path.join(directory, f"part-{chunk:05d}.parquet"), index=False)
+        written += len(part)
+    return written
+
+
+def generate(rows=DEFAULT_ROWS, output=DATA_PATH, output_format='csv', start=DEFAULT_START,
+             days=DEFAULT_DAYS, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, workers=None, model_fields=False,
+             on_progress=None):
+    _, counts = daily_counts(rows, start, days, seed)
+    chunks = plan_chunks(counts, chunk_rows)
+    columns = SOURCE_COLUMNS + (MODEL_COLUMNS if model_fields else [])
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    with Pool(workers) as pool:
+        if output_format == 'parquet':
+            tasks = [(chunk, first, day_counts, start, seed, model_fields, output)
+                     for chunk, first, day_counts in chunks]
+            for written in pool.imap_unordered(parquet_chunk, tasks):
+                done += written
+                if on_progress is not None:
+                    on_progress(done, rows)
+        else:
+            tasks = [(chunk, first, day_counts, start, seed, model_fields)
+                     for chunk, first, day_counts in chunks]
+            with open(output + ".tmp", "wb") as f:
+                f.write((",".join(columns) + "\n").encode('utf-8'))
+                # imap keeps chunk order, so rows stay sorted by timestamp
+                for data, (_, _, day_counts) in zip(pool.imap(csv_chunk, tasks), chunks):
+                    f.write(data)
+                    done += int(day_counts.sum())
+                    if on_progress is not None:
+                        on_progress(done, rows)
+            os.replace(output + ".tmp", output)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic facility task data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--output", default=None,
+                        help=f"CSV file or Parquet directory (default: '{DATA_PATH}' for CSV)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--model-fields", action="store_true",
+                        help="Also write the task fields used by the prediction model")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing output")
+    args = parser.parse_args()
+
+    output = args.output or (DATA_PATH if args.format == 'csv' else "facility_tasks")
+    if os.path.exists(output):
+        if not args.force:
+            parser.error(f"'{output}' already exists; pass --force to overwrite it")
+        if os.path.isdir(output):
+            if not all(name.startswith("month=") for name in os.listdir(output)):
+                parser.error(f"'{output}' is not a generated Parquet dataset; not overwriting it")
+            shutil.rmtree(output)
+
+    def report(done, total):
+        print(f"\r{done:,} / {total:,} rows", end="", flush=True)
+
+    rows = generate(args.rows, output, args.format, args.start, args.days, args.seed,
+                    args.chunk_rows, args.workers, args.model_fields, report)
+    print(f"\nSynthetic data ({rows:,} rows) has been generated and saved to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
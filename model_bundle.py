@@ -0,0 +1,93 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+
+import joblib
+
+from features import CATEGORICAL_FEATURES, MODEL_FEATURES
+
+# Single-file model artifact used at inference time
+BUNDLE_PATH = os.path.join('models', 'task_model_bundle.joblib')
+
+# Bump when the layout of the bundle dictionary changes
+BUNDLE_FORMAT = 1
+
+
+# Everything needed to score tasks: the booster, the categorical
+# vocabularies, the ordered feature schema and descriptive metadata
+class ModelBundle:
+    def __init__(self, model, vocabularies, feature_names, version, metadata):
+        self.model = model
+        self.vocabularies = vocabularies
+        self.feature_names = feature_names
+        self.version = version
+        self.metadata = metadata
+
+    @property
+    def booster(self):
+        return self.model.get_booster()
+
+
+# Content-derived version, so any change to the model or schema changes it
+def bundle_version(booster_raw, vocabularies, feature_names):
+    digest = hashlib.sha256(booster_raw)
+    for column in sorted(vocabularies):
+        digest.update(repr((column, list(vocabularies[column]))).encode("utf-8"))
+    digest.update(repr(list(feature_names)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Package a fitted XGBClassifier and its vocabularies (lists of labels or
+# fitted LabelEncoders) into a bundle dictionary ready for save_bundle
+def build_bundle(model, vocabularies, feature_names=MODEL_FEATURES, metadata=None):
+    import xgboost as xgb
+
+    booster_raw = bytes(model.get_booster().save_raw('ubj'))
+    vocabularies = {column: [str(label) for label in getattr(labels, 'classes_', labels)]
+                    for column, labels in vocabularies.items()}
+    feature_names = list(feature_names)
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': bundle_version(booster_raw, vocabularies, feature_names),
+        'booster': booster_raw,
+        'vocabularies': vocabularies,
+        'feature_names': feature_names,
+        'metadata': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'xgboost_version': xgb.__version__,
+            'n_classes': int(model.n_classes_),
+            **(metadata or {})
+        }
+    }
+
+
+def save_bundle(bundle, path=BUNDLE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(bundle, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+# Load a bundle and check it against the feature pipeline; raises ValueError
+# when the bundle does not match what features.py produces
+def load_bundle(path=BUNDLE_PATH):
+    import xgboost as xgb
+
+    bundle = joblib.load(path)
+    if bundle.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported model bundle format {bundle.get('format')!r} in '{path}'")
+    if bundle['feature_names'] != MODEL_FEATURES:
+        raise ValueError("Model bundle feature schema does not match the feature pipeline")
+    missing = [column for column in CATEGORICAL_FEATURES if column not in bundle['vocabularies']]
+    if missing:
+        raise ValueError(f"Model bundle has no vocabulary for: {', '.join(missing)}")
+
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(bundle['booster']))
+    booster_features = model.get_booster().feature_names
+    if booster_features is not None and list(booster_features) != bundle['feature_names']:
+        raise ValueError("Booster feature names do not match the bundle's feature schema")
+    if model.get_booster().num_features() != len(bundle['feature_names']):
+        raise ValueError("Booster feature count does not match the bundle's feature schema")
+
+    return ModelBundle(model, bundle['vocabularies'], bundle['feature_names'],
+                       bundle['version'], bundle['metadata'])
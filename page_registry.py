@@ -0,0 +1,19 @@
+import importlib
+
+# Pages reachable from the app besides the Dashboard: navigation name ->
+# module exposing render(). A page module, and whatever heavy libraries it
+# needs, is only imported the first time the page is visited; render() then
+# runs on every rerun.
+PAGES = {
+    "Visualization": "pages.visualization",
+    "Prediction": "pages.prediction",
+    "To-Do List": "pages.todo",
+}
+
+
+def page_module(name):
+    return importlib.import_module(PAGES[name])
+
+
+def render_page(name):
+    page_module(name).render()
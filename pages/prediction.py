@@ -3,71 +3,39 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import joblib
 import os
 from datetime import datetime, timedelta
-from sklearn.preprocessing import LabelEncoder
 
-# Configure page layout
-st.set_page_config(page_title="Task Prediction", page_icon="🔮", layout="wide")
+from features import RAW_FIELDS, build_features, encode_categoricals
+from model_bundle import BUNDLE_PATH, load_bundle
+from prediction_cache import PredictionCache
+from shap_analysis import build_explainer, explain_encoded
+from scoring import (DEFAULT_CHUNK_SIZE, MISSED_CLASS, export_scores, read_schedule,
+                     score_records, to_model_array)
+import spans
 
-# Add custom CSS to fix the deployment bar and padding
-st.markdown("""
-    <style>
-    /* Fix deployment bar */
-    [data-testid="stToolbar"] {
-        visibility: hidden;
-    }
-    
-    /* Adjust main content padding */
-    .main .block-container {
-        padding-top: 2rem !important;
-    }
-    
-    /* Hide decoration */
-    [data-testid="stDecoration"] {
-        display: none;
-    }
-    
-    /* Adjust header */
-    [data-testid="stHeader"] {
-        display: none;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-st.title("Task Completion Prediction")
-st.markdown('<style>div.block-container{padding-top:1rem;}</style>', unsafe_allow_html=True)
-
-# Load the trained model
+# Load the versioned model bundle once per process; every session shares it
 @st.cache_resource
-def load_model():
+def load_model_bundle():
     try:
-        # Use os.path.join for proper path handling
-        model_path = os.path.join('models', 'xgb_model.pkl')
-        model = joblib.load(model_path)
-        return model
+        return load_bundle(BUNDLE_PATH)
     except FileNotFoundError:
-        st.error("Model file not found. Please ensure 'xgb_model.pkl' is in the 'models' directory.")
+        st.error(f"Model bundle not found. Please run 'create_model_bundle.py' to create '{BUNDLE_PATH}'.")
         return None
     except Exception as e:
-        st.error(f"Error loading model: {str(e)}")
+        st.error(f"Error loading model bundle: {str(e)}")
         return None
 
-# Load feature names and label encoders
-@st.cache_data
-def load_feature_names():
-    try:
-        # Use os.path.join for proper path handling
-        feature_names_path = os.path.join('models', 'feature_names.pkl')
-        feature_names = joblib.load(feature_names_path)
-        return feature_names
-    except FileNotFoundError:
-        st.error("Feature names file not found. Please ensure 'feature_names.pkl' is in the 'models' directory.")
-        return None
-    except Exception as e:
-        st.error(f"Error loading feature names: {str(e)}")
-        return None
+# Prediction cache shared by every session; keyed on the model version, so a
+# new bundle never serves stale results
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache()
+
+# TreeSHAP explainer built once per model bundle version and shared by every session
+@st.cache_resource
+def get_explainer(bundle_version):
+    return build_explainer(load_model_bundle())
 
 # Create input form
 def create_input_form():
@@ -98,68 +66,35 @@ def create_input_form():
         delay_duration = st.number_input("Delay Duration (minutes)", min_value=0, max_value=1440, value=0)
         previous_task_delay = st.number_input("Previous Task Delay (minutes)", min_value=0, max_value=1440, value=0)
         rolling_avg_delay = st.number_input("Rolling Average Delay (minutes)", min_value=0, max_value=1440, value=0)
-        
-        # Calculate durations
-        if scheduled_time and actual_start_time:
-            start_duration = (datetime.combine(scheduled_date, actual_start_time) - 
-                            datetime.combine(scheduled_date, scheduled_time)).total_seconds() / 60
-        else:
-            start_duration = 0
-            
-        if actual_start_time and actual_completion_time:
-            actual_duration = (datetime.combine(scheduled_date, actual_completion_time) - 
-                             datetime.combine(scheduled_date, actual_start_time)).total_seconds() / 60
-        else:
-            actual_duration = 0
     
-    # Create feature dictionary
+    # Create the raw task record; model features are derived from it by the
+    # shared feature pipeline (see features.build_features)
     input_data = {
         'Facility_ID': facility_id,
         'Task_Type': task_type,
         'Priority': priority,
-        'Delay_Duration': delay_duration,
-        'Actual_Duration': actual_duration,
-        'Workload_Estimate': workload_estimate,
-        'Day_of_Week': scheduled_date.weekday(),
         'Time_Slot': time_slot,
         'Task_Frequency': task_frequency,
-        'Hour_of_Day': scheduled_time.hour if scheduled_time else 0,
-        'Week_of_Year': scheduled_date.isocalendar()[1],
-        'Day_of_Month': scheduled_date.day,
-        'Weekend': 1 if scheduled_date.weekday() >= 5 else 0,
+        'Workload_Estimate': workload_estimate,
+        'Delay_Duration': delay_duration,
         'Previous_Task_Delay': previous_task_delay,
         'Rolling_Avg_Delay': rolling_avg_delay,
-        'Scheduled_Year': scheduled_date.year,
-        'Scheduled_Month': scheduled_date.month,
-        'Scheduled_Day': scheduled_date.day,
-        'Scheduled_Weekday': scheduled_date.weekday(),
-        'Actual_Start_Hour': actual_start_time.hour if actual_start_time else 0,
-        'Actual_Completion_Hour': actual_completion_time.hour if actual_completion_time else 0,
-        'Start_Duration': start_duration
+        'Scheduled_Time': datetime.combine(scheduled_date, scheduled_time),
+        'Actual_Start_Time': datetime.combine(scheduled_date, actual_start_time),
+        'Actual_Completion_Time': datetime.combine(scheduled_date, actual_completion_time)
     }
     
     return input_data
 
-# Convert categorical variables to numerical
-def preprocess_input(input_data):
-    # Create a copy of the input data
-    df = pd.DataFrame([input_data])
-    
-    # Load label encoders
+# Build the model features for a batch of raw task records and encode the
+# categorical variables; a single form submission is a batch of one
+def preprocess_input(records, bundle):
     try:
-        task_type_encoder = joblib.load(os.path.join('models', 'task_type_encoder.pkl'))
-        priority_encoder = joblib.load(os.path.join('models', 'priority_encoder.pkl'))
-        time_slot_encoder = joblib.load(os.path.join('models', 'time_slot_encoder.pkl'))
-        
-        # Transform categorical variables
-        df['Task_Type'] = task_type_encoder.transform(df['Task_Type'])
-        df['Priority'] = priority_encoder.transform(df['Priority'])
-        df['Time_Slot'] = time_slot_encoder.transform(df['Time_Slot'])
-        
-        return df
+        features = build_features(records)
+        return features, encode_categoricals(features, bundle.vocabularies)
     except Exception as e:
         st.error(f"Error preprocessing input data: {str(e)}")
-        return None
+        return None, None
 
 # Display prediction results
 def display_prediction_results(prediction, probability):
@@ -202,24 +137,34 @@ def display_prediction_results(prediction, probability):
         st.markdown(f"- Completed: {(1-probability):.1%}")
 
 # Display model explanation
-def display_model_explanation(model, input_data):
+def display_model_explanation(bundle, input_data, model_input):
     st.subheader("Model Explanation")
     
-    # Get feature importance
+    # Local explanation: how each feature of this task moved its miss score
     try:
-        feature_importance = model.feature_importances_
+        contributions, base_value = explain_encoded(get_explainer(bundle.version), model_input, MISSED_CLASS)
+        local_df = pd.DataFrame({
+            'Feature': [f"{name} = {input_data[name]}" for name in bundle.feature_names],
+            'Contribution': contributions[0]
+        })
+        local_df = local_df.reindex(local_df['Contribution'].abs().sort_values().index).tail(10)
+        local_df['Effect'] = np.where(local_df['Contribution'] > 0, 'Raises miss risk', 'Lowers miss risk')
         
-        # Get feature names directly from the model
-        feature_names = [
-            'Facility_ID', 'Task_Type', 'Priority', 'Delay_Duration', 'Actual_Duration',
-            'Workload_Estimate', 'Day_of_Week', 'Time_Slot', 'Task_Frequency', 'Hour_of_Day',
-            'Week_of_Year', 'Day_of_Month', 'Weekend', 'Previous_Task_Delay', 'Rolling_Avg_Delay',
-            'Scheduled_Year', 'Scheduled_Month', 'Scheduled_Day', 'Scheduled_Weekday',
-            'Actual_Start_Hour', 'Actual_Completion_Hour', 'Start_Duration'
-        ]
+        fig = px.bar(local_df, x='Contribution', y='Feature', orientation='h', color='Effect',
+                    color_discrete_map={'Raises miss risk': '#F44336', 'Lowers miss risk': '#4CAF50'},
+                    title="Why This Task Got Its Score (SHAP)",
+                    labels={'Contribution': 'Contribution to Miss Score (log-odds)', 'Feature': 'Feature'})
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Base score {base_value:.3f}; the contributions add up to this task's miss score.")
+    except Exception as e:
+        st.warning(f"Could not compute the SHAP explanation: {str(e)}")
+    
+    # Get feature importance
+    try:
+        feature_importance = bundle.model.feature_importances_
         
         importance_df = pd.DataFrame({
-            'Feature': feature_names,
+            'Feature': bundle.feature_names,
             'Importance': feature_importance
         }).sort_values('Importance', ascending=True)
         
@@ -265,10 +210,94 @@ def display_recommendations(prediction, probability, input_data):
     else:
         st.success("The task is predicted to be completed successfully. Continue with the current plan.")
 
-def main():
-    # Load model and feature names
-    model = load_model()
-    if model is None:
+# Score an uploaded schedule of tasks and offer the miss probabilities for download
+def batch_scoring(bundle):
+    st.subheader("Score a Task Schedule")
+    st.markdown("Upload a CSV or Parquet file with one task per row and the columns: "
+                + ", ".join(f"`{field}`" for field in RAW_FIELDS))
+    
+    uploaded = st.file_uploader("Task schedule", type=["csv", "parquet"])
+    chunk_size = st.number_input("Rows per scoring chunk", min_value=1000, max_value=1_000_000,
+                                 value=DEFAULT_CHUNK_SIZE, step=1000)
+    explain = st.checkbox("Explain each task (adds SHAP_<feature> columns)", value=False)
+    if uploaded is None:
+        return
+    
+    if st.button("Score Schedule"):
+        try:
+            with spans.span("prediction.read_schedule") as section:
+                records = read_schedule(uploaded.getvalue(), uploaded.name)
+                section.rows = len(records)
+            progress = st.progress(0.0, text=f"Scoring {len(records):,} tasks...")
+            explainer = get_explainer(bundle.version) if explain else None
+            with spans.span("prediction.batch_score", rows=len(records)):
+                scored = score_records(bundle.booster, records, bundle.vocabularies, chunk_size=int(chunk_size),
+                                       on_progress=lambda done: progress.progress(done, text=f"Scored {done:.0%}"),
+                                       explain=(lambda X: explain_encoded(explainer, X, MISSED_CLASS)[0]) if explain else None)
+        except Exception as e:
+            st.error(f"Error scoring schedule: {str(e)}")
+            return
+        
+        # Keep the results so they survive the rerun triggered by the download button
+        data, mime = export_scores(scored, uploaded.name)
+        st.session_state.scored_schedule = {
+            'source': uploaded.name,
+            'rows': len(scored),
+            'missed': int((scored['Predicted_Class'] == MISSED_CLASS).sum()),
+            'preview': scored.nlargest(100, 'Miss_Probability'),
+            'data': data,
+            'mime': mime
+        }
+    
+    result = st.session_state.get('scored_schedule')
+    if result is None or result['source'] != uploaded.name:
+        return
+    
+    st.success(f"Scored {result['rows']:,} tasks; {result['missed']:,} are likely to be missed.")
+    st.dataframe(result['preview'], use_container_width=True)
+    
+    stem, extension = os.path.splitext(uploaded.name)
+    st.download_button("Download Miss Probabilities", data=result['data'],
+                       file_name=f"{stem}_scored{extension}", mime=result['mime'])
+
+# Render the page; called on every rerun, from app.py or when run on its own
+def render():
+    # Add custom CSS to fix the deployment bar and padding
+    st.markdown("""
+        <style>
+        /* Fix deployment bar */
+        [data-testid="stToolbar"] {
+            visibility: hidden;
+        }
+
+        /* Adjust main content padding */
+        .main .block-container {
+            padding-top: 2rem !important;
+        }
+
+        /* Hide decoration */
+        [data-testid="stDecoration"] {
+            display: none;
+        }
+
+        /* Adjust header */
+        [data-testid="stHeader"] {
+            display: none;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+    st.title("Task Completion Prediction")
+    st.markdown('<style>div.block-container{padding-top:1rem;}</style>', unsafe_allow_html=True)
+    
+    # Load the model bundle
+    bundle = load_model_bundle()
+    if bundle is None:
+        return
+    
+    mode = st.radio("Mode", ["Single Task", "Upload Schedule"], horizontal=True)
+    if mode == "Upload Schedule":
+        batch_scoring(bundle)
         return
     
     # Create input form
@@ -277,18 +306,30 @@ def main():
     # Create prediction button
     if st.button("Predict Task Completion"):
         # Preprocess input data
-        input_df = preprocess_input(input_data)
+        with spans.span("prediction.features", rows=1):
+            features, input_df = preprocess_input(pd.DataFrame([input_data]), bundle)
         if input_df is None:
             return
         
-        # Make prediction
-        prediction = model.predict(input_df)[0]
-        probability = model.predict_proba(input_df)[0][1]
+        # Make prediction: repeated submissions are answered from the cache,
+        # others with a single booster call
+        cache = get_prediction_cache()
+        with spans.span("prediction.predict", rows=1):
+            predictions, probabilities = cache.predict(bundle.booster, bundle.version, to_model_array(input_df))
+        prediction, probability = predictions[0], probabilities[0]
+        stats = cache.stats()
+        st.caption(f"Prediction cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
         
         # Display results
+        task_features = features.iloc[0]
         display_prediction_results(prediction, probability)
-        display_model_explanation(model, input_data)
-        display_recommendations(prediction, probability, input_data)
+        with spans.span("prediction.explain", rows=1):
+            display_model_explanation(bundle, task_features, to_model_array(input_df))
+        display_recommendations(prediction, probability, task_features)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Configure page layout
+    st.set_page_config(page_title="Task Prediction", page_icon="🔮", layout="wide")
+    spans.begin_page()
+    render()
+    spans.debug_panel()
\ No newline at end of file
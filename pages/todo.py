@@ -1,86 +1,127 @@
 import streamlit as st
-import pandas as pd
 
-# Configure page layout
-st.set_page_config(page_title="Task To-Do List", page_icon="✅", layout="wide")
-st.title("✅ Facility Task To-Do List")
+import spans
+from task_store import DEFAULT_PAGE_SIZE, PRIORITIES, STATUSES, TaskStore
 
-# Initialize session state for the to-do list if not already initialized
-if 'tasks' not in st.session_state:
-    st.session_state.tasks = []
+# Page sizes offered for the task grid
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Task list shared by every session, persisted in SQLite
+@st.cache_resource
+def task_store():
+    return TaskStore()
 
 # Function to add a task to the list
 def add_task(task, status, priority):
-    st.session_state.tasks.append({
-        'task': task, 
-        'Completed': False, 
-        'Delayed': False, 
-        'Missed': False,
-        'Priority': priority
-    })
-    st.session_state.tasks[-1][status] = True
-
-# Function to update task status
-def update_task(index, status):
-    # Reset all statuses before setting the new one
-    st.session_state.tasks[index]['Completed'] = False
-    st.session_state.tasks[index]['Delayed'] = False
-    st.session_state.tasks[index]['Missed'] = False
-    # Set the new status
-    st.session_state.tasks[index][status] = True
-    # Force a rerun to update the display
-    st.rerun()
-
-# Input form to add a new task
-with st.form(key='add_task_form'):
-    col1, col2 = st.columns(2)
-    with col1:
-        task_input = st.text_input('Enter a new task:')
-        priority_input = st.selectbox('Priority:', ['High', 'Medium', 'Low'])
-    with col2:
-        status_input = st.selectbox('Status:', ['Completed', 'Delayed', 'Missed'])
-        submit_button = st.form_submit_button('Add Task')
-
-    if submit_button and task_input:
-        add_task(task_input, status_input, priority_input)
-        st.success(f'Task "{task_input}" added successfully!')
-        st.rerun()
-
-# Display the to-do list as a table
-st.subheader('Tasks:')
-if st.session_state.tasks:
-    # Create a DataFrame to display the tasks in a table format
-    tasks_df = pd.DataFrame(st.session_state.tasks)
-    
-    # Reorder columns for better display
-    tasks_df = tasks_df[['task', 'Priority', 'Completed', 'Delayed', 'Missed']]
-    
-    # Rename columns for better display
-    tasks_df.columns = ['Task', 'Priority', 'Completed', 'Delayed', 'Missed']
-    
-    # Sort by priority (High -> Medium -> Low)
-    priority_order = {'High': 0, 'Medium': 1, 'Low': 2}
-    tasks_df['Priority_Order'] = tasks_df['Priority'].map(priority_order)
-    tasks_df = tasks_df.sort_values('Priority_Order')
-    tasks_df = tasks_df.drop('Priority_Order', axis=1)
-
-    # Display the table
-    st.dataframe(tasks_df, use_container_width=True)
-
-    # Edit task status
-    st.subheader('Update Task Status')
-    for index, task in enumerate(st.session_state.tasks):
-        col1, col2 = st.columns([3, 1])
+    task_store().add(task, status, priority)
+
+# Save the tasks of the edited page whose status or priority changed, in one
+# batched write; rows are matched to the rendered snapshot by task ID.
+# Returns the number of tasks updated.
+def save_changes(original, edited):
+    original = original.set_index('ID')
+    edited = edited.set_index('ID').reindex(original.index)
+    changed = ((edited['Status'].astype(str) != original['Status'].astype(str))
+               | (edited['Priority'].astype(str) != original['Priority'].astype(str)))
+    rows = edited[changed]
+    return task_store().update_many(zip(rows.index, rows['Status'].astype(str), rows['Priority'].astype(str)))
+
+# The page of tasks shown in the grid, kept in the session: while the grid is
+# being saved the snapshot the user edited is reused, whatever other sessions
+# changed since, and its version (part of the editor's key) only changes when
+# a fresh read shows different rows
+def page_snapshot(store, view, saving):
+    snapshot = st.session_state.get('todo_snapshot')
+    if saving and snapshot is not None:
+        return snapshot
+    rows = store.page(*view)
+    if snapshot is None or snapshot['view'] != view or not snapshot['rows'].equals(rows):
+        version = snapshot['version'] + 1 if snapshot is not None else 0
+        snapshot = {'view': view, 'rows': rows, 'version': version}
+        st.session_state.todo_snapshot = snapshot
+    return snapshot
+
+# Render the page; called on every rerun, from app.py or when run on its own
+def render():
+    st.title("✅ Facility Task To-Do List")
+    store = task_store()
+
+    # Input form to add a new task
+    with st.form(key='add_task_form'):
+        col1, col2 = st.columns(2)
         with col1:
-            new_status = st.selectbox(
-                f"Update status for '{task['task']}'",
-                ['Completed', 'Delayed', 'Missed'],
-                index=['Completed', 'Delayed', 'Missed'].index('Completed' if task['Completed'] else 'Delayed' if task['Delayed'] else 'Missed'),
-                key=f'progress_{index}'
-            )
+            task_input = st.text_input('Enter a new task:')
+            priority_input = st.selectbox('Priority:', PRIORITIES)
         with col2:
-            if st.button(f'Update', key=f'update_{index}'):
-                update_task(index, new_status)
-                st.success(f"Status for task '{task['task']}' updated to {new_status}.")
-else:
-    st.write("No tasks available.") 
\ No newline at end of file
+            status_input = st.selectbox('Status:', STATUSES)
+            submit_button = st.form_submit_button('Add Task')
+
+        if submit_button and task_input:
+            add_task(task_input, status_input, priority_input)
+            st.success(f'Task "{task_input}" added successfully!')
+            st.rerun()
+
+    if 'todo_saved' in st.session_state:
+        st.success(f"Updated {st.session_state.pop('todo_saved')} task(s).")
+
+    # Filters are applied by the store, so only the matching page is read
+    st.subheader('Tasks:')
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        status_filter = st.multiselect('Status:', STATUSES, key='todo_status_filter')
+    with col2:
+        priority_filter = st.multiselect('Priority:', PRIORITIES, key='todo_priority_filter')
+    with col3:
+        page_size = st.selectbox('Rows per page:', PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+
+    total = store.count(status_filter, priority_filter)
+    if not total:
+        st.write("No tasks available.")
+        return
+
+    pages = (total - 1) // page_size + 1
+    page = st.number_input(f"Page (of {pages}, {total} tasks)", min_value=1, max_value=pages,
+                           value=1, step=1) - 1
+    with spans.span("todo.page", rows=total) as section:
+        snapshot = page_snapshot(store, (page, page_size, status_filter, priority_filter),
+                                 st.session_state.get('todo_save', False))
+        tasks_df = snapshot['rows']
+        section.rows = len(tasks_df)
+
+    # Editable grid, sorted by priority (High -> Medium -> Low). Edits stay in
+    # the browser until the form is submitted, then are written in one batch
+    # followed by a single rerun.
+    with st.form(key='edit_tasks_form'), spans.span("todo.table", rows=len(tasks_df)):
+        edited = st.data_editor(
+            tasks_df,
+            column_order=['Task', 'Priority', 'Status', 'Created'],
+            column_config={
+                'Priority': st.column_config.SelectboxColumn('Priority', options=PRIORITIES, required=True),
+                'Status': st.column_config.SelectboxColumn('Status', options=STATUSES, required=True),
+                'Created': st.column_config.DatetimeColumn('Created', format="YYYY-MM-DD HH:mm"),
+            },
+            disabled=['Task', 'Created'],
+            hide_index=True,
+            use_container_width=True,
+            key=f"todo_editor_{snapshot['version']}",
+        )
+        if st.form_submit_button('Save Changes', key='todo_save'):
+            st.session_state.todo_saved = save_changes(tasks_df, edited)
+            st.rerun()
+
+    # Close out every task matching the filters (all pages) at once
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        bulk_status = st.selectbox(f"Set the status of all {total} filtered task(s) to:", STATUSES)
+    with col2:
+        if st.button('Apply to All'):
+            st.session_state.todo_saved = store.set_status(bulk_status, status_filter, priority_filter)
+            st.rerun()
+
+
+if __name__ == "__main__":
+    # Configure page layout
+    st.set_page_config(page_title="Task To-Do List", page_icon="✅", layout="wide")
+    spans.begin_page()
+    render()
+    spans.debug_panel()
@@ -0,0 +1,170 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_loader import CATEGORY_COLUMNS, derive_columns
+
+# Reading of date-partitioned task datasets: a directory of Parquet files
+# under month=YYYY-MM sub-directories (the layout written by
+# `generate_data.py --format parquet`), optionally split further by
+# Facility_ID=N. Only the partitions that can hold rows of the requested date
+# range and facilities are opened; they are read in parallel by a thread pool
+# (pyarrow releases the GIL while decoding) and concatenated as Arrow tables,
+# which only links their buffers, before one conversion to pandas. A single
+# Parquet file is a dataset with one partition.
+
+MONTH_KEY = 'month'
+FACILITY_KEY = 'Facility_ID'
+
+
+def parquet_files(source):
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, "**", "*.parquet"), recursive=True))
+    else:
+        files = [source] if os.path.exists(source) else []
+    if not files:
+        raise FileNotFoundError(f"No Parquet files found at '{source}'")
+    return files
+
+
+# Changes whenever a Parquet file of `source` is added, removed or rewritten
+def dataset_version(source):
+    stats = [(path, os.stat(path)) for path in parquet_files(source)]
+    return hash(tuple((path, stat.st_mtime_ns, stat.st_size) for path, stat in stats))
+
+
+# key=value directory names between `source` and a file, as a dict
+def partition_keys(source, path):
+    if not os.path.isdir(source):
+        return {}
+    directories = os.path.relpath(os.path.dirname(path), source).split(os.sep)
+    return dict(part.split("=", 1) for part in directories if "=" in part)
+
+
+# Files of the dataset with their partition keys, in path order (which is
+# timestamp order for the generator's layout)
+def list_partitions(source):
+    return [(path, partition_keys(source, path)) for path in parquet_files(source)]
+
+
+# First and last day of a month=YYYY-MM partition
+def month_range(month):
+    period = pd.Period(month, freq='M')
+    return period.start_time, period.end_time.normalize()
+
+
+# Whether a partition can hold rows between days `start` and `end`
+# (inclusive) of one of `facilities`; None means no restriction
+def partition_matches(keys, start=None, end=None, facilities=None):
+    if MONTH_KEY in keys:
+        first, last = month_range(keys[MONTH_KEY])
+        if start is not None and last < pd.Timestamp(start).normalize():
+            return False
+        if end is not None and first > pd.Timestamp(end).normalize():
+            return False
+    if facilities is not None and FACILITY_KEY in keys:
+        return int(keys[FACILITY_KEY]) in {int(facility) for facility in facilities}
+    return True
+
+
+# Row filters for pyarrow: the same restrictions, applied with row-group
+# statistics to skip data inside the files that are read
+def row_filters(start=None, end=None, facilities=None, keys=None):
+    filters = []
+    if start is not None:
+        filters.append(('Timestamp', '>=', pd.Timestamp(start).normalize().to_pydatetime()))
+    if end is not None:
+        next_day = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        filters.append(('Timestamp', '<', next_day.to_pydatetime()))
+    if facilities is not None and FACILITY_KEY not in (keys or {}):
+        filters.append((FACILITY_KEY, 'in', [int(facility) for facility in facilities]))
+    return filters or None
+
+
+def read_partition(path, keys, columns=None, start=None, end=None, facilities=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    # text columns kept as categoricals come back dictionary-encoded
+    dictionary = [column for column in CATEGORY_COLUMNS if column in schema.names]
+    file_columns = None if columns is None else [column for column in columns if column in schema.names]
+    table = pq.read_table(path, columns=file_columns, filters=row_filters(start, end, facilities, keys),
+                          read_dictionary=dictionary)
+    # a Facility_ID directory stands for a column missing from the file
+    if FACILITY_KEY in keys and FACILITY_KEY not in table.column_names and (
+            columns is None or FACILITY_KEY in columns):
+        table = table.append_column(FACILITY_KEY, pa.array([int(keys[FACILITY_KEY])] * table.num_rows,
+                                                           type=pa.int64()))
+    return table
+
+
+# Task rows of a Parquet dataset between days `start` and `end` (inclusive)
+# and of `facilities`, with the derived dashboard columns. Partitions outside
+# the range are skipped and the rest read by `workers` threads.
+def read_partitioned(source, start=None, end=None, facilities=None, columns=None, workers=None):
+    import pyarrow as pa
+
+    partitions = list_partitions(source)
+    # with no matching partition, the row filters on the first one still
+    # give an empty frame with the dataset's columns
+    selected = [(path, keys) for path, keys in partitions
+                if partition_matches(keys, start, end, facilities)] or partitions[:1]
+    if columns is not None:
+        # needed by the derived columns
+        columns = ['Timestamp', 'Task_Status'] + [column for column in columns
+                                                  if column not in ('Timestamp', 'Task_Status')]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(selected)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tables = list(pool.map(lambda partition: read_partition(*partition, columns, start, end, facilities),
+                               selected))
+    table = pa.concat_tables(tables, promote_options='default')
+    del tables
+    # the Arrow buffers are released column by column while converting
+    frame = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    # dictionaries list values in order of appearance; sort them like a
+    # categorical built from the CSV
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].cat.reorder_categories(sorted(frame[column].cat.categories))
+    if not frame['Timestamp'].is_monotonic_increasing:
+        frame = frame.sort_values('Timestamp', ignore_index=True, kind='stable')
+    return derive_columns(frame)
+
+
+# Timestamp range of a file from its row-group statistics (footer only)
+def file_time_range(path):
+    import pyarrow.parquet as pq
+
+    metadata = pq.ParquetFile(path).metadata
+    column = metadata.schema.to_arrow_schema().get_field_index('Timestamp')
+    lows, highs = [], []
+    for group in range(metadata.num_row_groups):
+        statistics = metadata.row_group(group).column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            return None
+        lows.append(statistics.min)
+        highs.append(statistics.max)
+    if not lows:
+        return None
+    return pd.Timestamp(min(lows)), pd.Timestamp(max(highs))
+
+
+# First and last task day of a dataset, read from the footers of its first
+# and last month partitions (every file when the statistics are missing)
+def dataset_bounds(source):
+    partitions = list_partitions(source)
+    months = sorted({keys[MONTH_KEY] for _, keys in partitions if MONTH_KEY in keys})
+    if months:
+        edge = {months[0], months[-1]}
+        paths = [path for path, keys in partitions if keys.get(MONTH_KEY) in edge]
+    else:
+        paths = [path for path, _ in partitions]
+    ranges = [file_time_range(path) for path in paths]
+    if any(found is None for found in ranges):
+        times = read_partitioned(source, columns=[])['Timestamp']
+        return (times.iloc[0].normalize(), times.iloc[-1].normalize()) if len(times) else (None, None)
+    return min(low for low, _ in ranges).normalize(), max(high for _, high in ranges).normalize()
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from scoring import predict_encoded
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+# LRU cache with a time-to-live in front of predict_encoded. Entries are
+# keyed by a hash of the model version and the encoded feature vector, and
+# the whole cache is dropped as soon as a different model version is used.
+# Safe to share between sessions and threads.
+class PredictionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_version, row):
+        digest = hashlib.blake2b(model_version.encode("utf-8"), digest_size=16)
+        digest.update(np.ascontiguousarray(row, dtype=np.float32).tobytes())
+        return digest.digest()
+
+    # Predicted classes and miss probabilities for encoded rows; only rows
+    # not already cached reach the booster, in a single call
+    def predict(self, booster, model_version, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        keys = [self.key(model_version, row) for row in X]
+        classes = np.empty(len(X), dtype=np.int64)
+        miss_probabilities = np.empty(len(X), dtype=np.float64)
+
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[2] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    classes[i], miss_probabilities[i] = entry[0], entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(i)
+                    self.misses += 1
+
+        if missing:
+            classes[missing], miss_probabilities[missing] = predict_encoded(booster, X[missing])
+            with self._lock:
+                if model_version == self.model_version:
+                    for i in missing:
+                        self._entries[keys[i]] = (classes[i], miss_probabilities[i], now)
+                        self._entries.move_to_end(keys[i])
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return classes, miss_probabilities
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'model_version': self.model_version,
+            }
@@ -0,0 +1,418 @@
+import glob
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CACHE_DIR, DATA_PATH, shared_loader
+from exports import EXPORT_FORMATS, export_rows
+import partitions
+import rollups
+from task_index import TaskIndex, shared_index
+
+# Query backends behind the dashboard widgets. Both answer the same questions
+# (KPIs, daily trend, heatmap, weekend breakdown, insights, filtered rows) and
+# hand back small pandas results ready for Plotly:
+#
+# - PandasBackend: the in-memory path. Widgets read a pre-aggregated rollup
+#   and the task index of the rows in memory: the whole CSV, or the month
+#   partitions of a Parquet dataset covering the dates asked for.
+# - DuckDBBackend: queries Parquet files (one file, or a directory such as the
+#   month=YYYY-MM dataset written by generate_data.py) with DuckDB. Filters and
+#   column selections are pushed down into the scan, so only the aggregated
+#   result is ever held in memory and the history does not have to fit in RAM.
+#
+# DASHBOARD_DATA selects the source (default: the CSV read by the pages) and
+# DASHBOARD_BACKEND the backend: 'duckdb', 'pandas', or 'auto' (DuckDB for a
+# Parquet source when it is installed, pandas otherwise).
+#
+# Filters are keyword arguments shared by every query: start / end (inclusive
+# dates), statuses and task_types (lists of accepted values; None means no
+# restriction, an empty list matches nothing).
+
+DATA_SOURCE = os.environ.get("DASHBOARD_DATA", DATA_PATH)
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "auto")
+
+# Query results kept per DuckDB backend, keyed by data version and query
+MAX_CACHED_QUERIES = 256
+
+
+def duckdb_available():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Whether `source` is a Parquet file or a directory of Parquet files
+def is_parquet_source(source):
+    return os.path.isdir(source) or source.endswith(".parquet")
+
+
+# Heatmap pivot without any cell
+def _empty_heatmap():
+    return pd.DataFrame(index=pd.Index([], name="Day_of_Month"), columns=pd.Index([], name="Hour_of_Day"))
+
+
+# Miss-rate figures of the "Key Insights" card from counts grouped by hour,
+# task type and weekend, with `count`, `missed` and `completed` columns
+def insights_from_counts(counts):
+    missed_by_hour = counts.groupby('Hour_of_Day')['missed'].sum()
+    missed_by_hour = missed_by_hour[missed_by_hour > 0]
+    peak_hour = missed_by_hour.idxmax() if not missed_by_hour.empty else None
+
+    by_type = counts.groupby('Task_Type', observed=True)[['count', 'missed']].sum()
+    miss_rate = (by_type['missed'] / by_type['count']).sort_values(ascending=False, kind='stable')
+    high_risk_type = miss_rate.index[0] if not miss_rate.empty else "Unknown"
+
+    def completion_rate(rows):
+        total = counts.loc[rows, 'count'].sum()
+        return counts.loc[rows, 'completed'].sum() / total * 100 if total > 0 else np.nan
+
+    weekend = counts['Weekend'] == 1
+    return {
+        'peak_hour': peak_hour,
+        'high_risk_type': high_risk_type,
+        'weekend_completion': completion_rate(weekend),
+        'weekday_completion': completion_rate(~weekend),
+    }
+
+
+# ------------- In-memory pandas backend -------------
+
+# Month windows of Parquet sources kept in memory, across all sessions
+MAX_CACHED_WINDOWS = 4
+
+_windows = OrderedDict()
+_windows_lock = threading.Lock()
+
+
+# Frame, rollup and index of the whole months of a Parquet source covering
+# days `start` to `end` (None: open-ended). Only those month partitions are
+# read; a cached window spanning the requested months is reused.
+def _load_window(source, version, start=None, end=None):
+    first = None if start is None else pd.Period(start, freq='M')
+    last = None if end is None else pd.Period(end, freq='M')
+
+    def covers(key):
+        return (key[0] == source and key[1] == version
+                and (key[2] is None or (first is not None and key[2] <= first))
+                and (key[3] is None or (last is not None and key[3] >= last)))
+
+    with _windows_lock:
+        for key in _windows:
+            if covers(key):
+                _windows.move_to_end(key)
+                return _windows[key]
+        frame = partitions.read_partitioned(source, None if first is None else first.start_time,
+                                            None if last is None else last.end_time)
+        window = (frame, rollups.build_rollup(frame), TaskIndex(frame))
+        _windows[(source, version, first, last)] = window
+        while len(_windows) > MAX_CACHED_WINDOWS:
+            _windows.popitem(last=False)
+        return window
+
+
+# Snapshot of the in-memory data of a source; cheap to create on every rerun.
+# A CSV is served from the loader, rollup and index shared by all sessions.
+# A Parquet source is read per window of months: queries load (and cache)
+# only the month partitions their date filters cover.
+class PandasBackend:
+    name = "pandas"
+
+    def __init__(self, source=DATA_PATH, cache_dir=CACHE_DIR):
+        self.source = source
+        self.partitioned = is_parquet_source(source)
+        if self.partitioned:
+            self.version = partitions.dataset_version(source)
+        else:
+            # one refresh, with the rollup and index taken for its frame
+            rollup, index = rollups.shared_rollup(source, cache_dir), shared_index(source, cache_dir)
+            self.frame, self.rollup, self.index, self.version = shared_loader(source, cache_dir).snapshot(
+                lambda frame, version: (frame, rollup.table_for(frame), index.index_for(frame), version))
+
+    # (frame, rollup, index) holding at least the days `start` to `end`
+    def _data(self, start=None, end=None):
+        if not self.partitioned:
+            return self.frame, self.rollup, self.index
+        return _load_window(self.source, self.version, start, end)
+
+    def _filtered(self, start=None, end=None, statuses=None, task_types=None):
+        rollup = self._data(start, end)[1]
+        return rollups.filter_rollup(rollup, start, end, statuses, task_types)
+
+    def _rows(self, start=None, end=None, statuses=None, task_types=None):
+        frame, _, index = self._data(start, end)
+        return frame, index, index.positions(start, end, Task_Status=statuses, Task_Type=task_types)
+
+    # First and last task date, or (None, None) without data
+    def date_bounds(self):
+        if self.partitioned:
+            return partitions.dataset_bounds(self.source)
+        if self.rollup.empty:
+            return None, None
+        return self.rollup['date'].iloc[0], self.rollup['date'].iloc[-1]
+
+    # Sorted distinct values of a column among the filtered tasks
+    def distinct(self, column, **filters):
+        table = self._filtered(**filters)
+        if column == 'Day_of_Month':
+            return sorted(pd.to_datetime(pd.Series(table['date'].unique())).dt.day.unique())
+        return sorted(table[column].unique())
+
+    def totals(self, **filters):
+        return rollups.totals(self._filtered(**filters))
+
+    def status_counts_on(self, day):
+        return rollups.status_counts_on(self._data(day, day)[1], day)
+
+    def daily_trend(self, **filters):
+        return rollups.daily_trend(self._filtered(**filters))
+
+    def heatmap_counts(self, days=None, hours=None, task_type=None, **filters):
+        return rollups.heatmap_counts(self._filtered(**filters), days, hours, task_type)
+
+    def weekend_status(self, **filters):
+        return rollups.weekend_status(self._filtered(**filters))
+
+    def insights(self, **filters):
+        return rollups.insights(self._filtered(**filters))
+
+    def recent(self, n=5):
+        last = self.date_bounds()[1] if self.partitioned else None
+        return self._data(last, last)[0].nlargest(n, 'Timestamp')
+
+    def numeric_columns(self):
+        last = self.date_bounds()[1] if self.partitioned else None
+        return self._data(last, last)[0].select_dtypes(include=['number']).columns.tolist()
+
+    # Up to `max_rows` filtered rows (a uniform sample beyond that) of
+    # `columns`, plus their `missed` flags
+    def sample_rows(self, columns, max_rows, **filters):
+        _, index, positions = self._rows(**filters)
+        if len(positions) > max_rows:
+            positions = np.sort(np.random.default_rng(42).choice(positions, max_rows, replace=False))
+        return index.take(positions, columns), index.take(positions, 'missed')
+
+    # Contents of a download of the filtered rows in `export_format`
+    def export(self, export_format, **filters):
+        frame, _, positions = self._rows(**filters)
+        return export_rows(frame, positions, export_format)
+
+
+# ------------- Out-of-core DuckDB backend -------------
+
+def _literal(value):
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _in(column, values):
+    if not values:
+        return "FALSE"
+    return f"{column} IN ({', '.join(_literal(value) for value in values)})"
+
+
+# Columns added to the source rows, as in data_loader.derive_columns
+DERIVED_COLUMNS = {
+    'date': "CAST(date_trunc('day', Timestamp) AS TIMESTAMP)",
+    'Hour_of_Day': "CAST(hour(Timestamp) AS TINYINT)",
+    'Day_of_Week': "CAST(isodow(Timestamp) - 1 AS TINYINT)",
+    'Weekend': "CAST(isodow(Timestamp) >= 6 AS TINYINT)",
+    'Day_of_Month': "CAST(day(Timestamp) AS TINYINT)",
+    'missed': "CAST(lower(Task_Status) = 'missed' AS TINYINT)",
+}
+
+NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                 'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE', 'DECIMAL')
+
+# DuckDB COPY options per export format
+COPY_OPTIONS = {
+    "CSV": "FORMAT csv, HEADER true",
+    "CSV (gzip)": "FORMAT csv, HEADER true, COMPRESSION gzip",
+    "Parquet": "FORMAT parquet, COMPRESSION zstd",
+}
+
+
+# Queries a Parquet source in place through a `tasks` view with the derived
+# columns. Date filters are applied to Timestamp (and to the month partition
+# of a month=YYYY-MM dataset) so DuckDB can skip whole files and row groups.
+# One backend is shared by all sessions; each query runs on its own cursor.
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self, source):
+        import duckdb
+
+        self.source = source
+        self.version = None
+        self._conn = duckdb.connect()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    # Re-read the list of files when they changed since the last query
+    def refresh(self):
+        version = partitions.dataset_version(self.source)
+        with self._refresh_lock:
+            if version != self.version:
+                self._create_view()
+                self.version = version
+        return self
+
+    def _create_view(self):
+        if os.path.isdir(self.source):
+            pattern = os.path.join(self.source, "**", "*.parquet")
+            self.partitioned = bool(glob.glob(os.path.join(self.source, "month=*")))
+        else:
+            pattern, self.partitioned = self.source, False
+        scan = (f"read_parquet({_literal(pattern)}, union_by_name = true"
+                f"{', hive_partitioning = true' if self.partitioned else ''})")
+        columns = [row[0] for row in self._conn.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()]
+        source_columns = [f'"{column}"' for column in columns if column not in DERIVED_COLUMNS]
+        derived = [f'{expression} AS "{column}"' for column, expression in DERIVED_COLUMNS.items()]
+        self._conn.execute(f"CREATE OR REPLACE VIEW tasks AS SELECT {', '.join(source_columns + derived)} FROM {scan}")
+        self.columns = [column for column in columns if column not in DERIVED_COLUMNS] + list(DERIVED_COLUMNS)
+
+    # Result of `sql` as a DataFrame, cached until the files change
+    def _query(self, sql):
+        key = (self.version, sql)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        with self._conn.cursor() as cursor:
+            result = cursor.execute(sql).df()
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > MAX_CACHED_QUERIES:
+                self._results.popitem(last=False)
+        return result
+
+    def _where(self, start=None, end=None, statuses=None, task_types=None, extra=()):
+        clauses = list(extra)
+        if start is not None:
+            start = pd.Timestamp(start).normalize()
+            clauses.append(f"Timestamp >= TIMESTAMP '{start}'")
+            if self.partitioned:
+                clauses.append(f"month >= '{start:%Y-%m}'")
+        if end is not None:
+            end = pd.Timestamp(end).normalize()
+            clauses.append(f"Timestamp < TIMESTAMP '{end + pd.Timedelta(days=1)}'")
+            if self.partitioned:
+                clauses.append(f"month <= '{end:%Y-%m}'")
+        if statuses is not None:
+            clauses.append(_in("Task_Status", statuses))
+        if task_types is not None:
+            clauses.append(_in("Task_Type", task_types))
+        return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+    def date_bounds(self):
+        row = self._query("SELECT min(Timestamp) AS first, max(Timestamp) AS last FROM tasks").iloc[0]
+        if pd.isna(row['first']):
+            return None, None
+        return pd.Timestamp(row['first']).normalize(), pd.Timestamp(row['last']).normalize()
+
+    def distinct(self, column, **filters):
+        result = self._query(f'SELECT DISTINCT "{column}" AS value FROM tasks{self._where(**filters)} ORDER BY 1')
+        return result['value'].tolist()
+
+    def totals(self, **filters):
+        row = self._query("SELECT count(*) AS total, count(*) FILTER (WHERE missed = 1) AS missed "
+                          f"FROM tasks{self._where(**filters)}").iloc[0]
+        return int(row['total']), int(row['missed'])
+
+    def status_counts_on(self, day):
+        result = self._query(f"SELECT Task_Status, count(*) AS count FROM tasks{self._where(day, day)} "
+                             "GROUP BY Task_Status ORDER BY Task_Status")
+        return result.set_index('Task_Status')['count']
+
+    def daily_trend(self, **filters):
+        return self._query(
+            "SELECT date, count(*) FILTER (WHERE Task_Status = 'Completed') AS completed, "
+            f"count(*) FILTER (WHERE missed = 1) AS missed FROM tasks{self._where(**filters)} "
+            "GROUP BY date ORDER BY date")
+
+    def heatmap_counts(self, days=None, hours=None, task_type=None, **filters):
+        extra = []
+        if days is not None:
+            extra.append(_in("Day_of_Month", days))
+        if hours is not None:
+            extra.append(_in("Hour_of_Day", hours))
+        if task_type is not None:
+            extra.append(f"Task_Type = {_literal(task_type)}")
+        counts = self._query("SELECT Day_of_Month, Hour_of_Day, count(*) AS count "
+                             f"FROM tasks{self._where(extra=extra, **filters)} GROUP BY ALL")
+        if counts.empty:
+            return _empty_heatmap()
+        return counts.pivot_table(index="Day_of_Month", columns="Hour_of_Day",
+                                  values="count", aggfunc="sum", fill_value=0)
+
+    def weekend_status(self, **filters):
+        return self._query(f"SELECT Weekend, Task_Status, count(*) AS count FROM tasks{self._where(**filters)} "
+                           "GROUP BY ALL ORDER BY Weekend, Task_Status")
+
+    def insights(self, **filters):
+        return insights_from_counts(self._query(
+            "SELECT Hour_of_Day, Task_Type, Weekend, count(*) AS count, "
+            "count(*) FILTER (WHERE missed = 1) AS missed, "
+            "count(*) FILTER (WHERE Task_Status = 'Completed') AS completed "
+            f"FROM tasks{self._where(**filters)} GROUP BY ALL ORDER BY Hour_of_Day, Task_Type"))
+
+    def recent(self, n=5):
+        return self._query(f"SELECT * FROM tasks ORDER BY Timestamp DESC LIMIT {int(n)}")
+
+    def numeric_columns(self):
+        types = self._conn.execute("DESCRIBE tasks").fetchall()
+        return [name for name, column_type, *_ in types if column_type.split('(')[0] in NUMERIC_TYPES]
+
+    def sample_rows(self, columns, max_rows, **filters):
+        selected = ", ".join(f'"{column}"' for column in columns)
+        with self._conn.cursor() as cursor:
+            rows = cursor.execute(
+                f"SELECT * FROM (SELECT {selected}, missed AS __missed FROM tasks{self._where(**filters)}) "
+                f"USING SAMPLE reservoir({int(max_rows)} ROWS) REPEATABLE (42)").df()
+        return rows[list(columns)], rows['__missed']
+
+    # The filtered rows written by DuckDB straight to a temporary file, so the
+    # rows never pass through pandas
+    def export(self, export_format, **filters):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export" + EXPORT_FORMATS[export_format][0])
+            with self._conn.cursor() as cursor:
+                cursor.execute(f"COPY (SELECT * FROM tasks{self._where(**filters)} ORDER BY Timestamp) "
+                               f"TO {_literal(path)} ({COPY_OPTIONS[export_format]})")
+            with open(path, "rb") as f:
+                return f.read()
+
+
+_duckdb_backends = {}
+_duckdb_lock = threading.Lock()
+
+
+# Name of the backend used for `source` with the `backend` setting
+def backend_name(source=DATA_SOURCE, backend=BACKEND):
+    if backend == "auto":
+        return "duckdb" if is_parquet_source(source) and duckdb_available() else "pandas"
+    if backend == "duckdb" and not is_parquet_source(source):
+        raise ValueError(f"The DuckDB backend reads Parquet sources; '{source}' is not one")
+    if backend not in ("duckdb", "pandas"):
+        raise ValueError(f"Unknown query backend '{backend}'")
+    return backend
+
+
+# Backend answering the dashboard queries for `source`, up to date with it
+def current_backend(source=DATA_SOURCE, backend=BACKEND, cache_dir=CACHE_DIR):
+    if backend_name(source, backend) == "pandas":
+        return PandasBackend(source, cache_dir)
+    key = os.path.abspath(source)
+    with _duckdb_lock:
+        if key not in _duckdb_backends:
+            _duckdb_backends[key] = DuckDBBackend(source)
+        shared = _duckdb_backends[key]
+    return shared.refresh()
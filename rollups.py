@@ -0,0 +1,210 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CACHE_DIR, DATA_PATH, concat_frames, read_json, shared_loader, write_json
+
+# Dimensions of the task count rollup; Facility_ID is added when the data has it
+ROLLUP_KEYS = ['date', 'Hour_of_Day', 'Task_Type', 'Task_Status']
+OPTIONAL_KEYS = ['Facility_ID']
+
+
+def rollup_keys(columns):
+    return ROLLUP_KEYS + [key for key in OPTIONAL_KEYS if key in columns]
+
+
+# Count task rows per date x hour x Task_Type x Task_Status (x Facility_ID),
+# sorted by date so range filters only touch the days requested
+def build_rollup(df):
+    keys = rollup_keys(df.columns)
+    table = (df.groupby(keys, observed=True, dropna=False, sort=False)
+             .size().rename('count').reset_index())
+    return table.sort_values(keys, ignore_index=True)
+
+
+# Fold the counts of newly ingested rows into an existing rollup. Appended
+# rows are recent, so only the days from the earliest new date onwards are
+# regrouped; older days are kept as they are.
+def merge_rollup(table, delta):
+    if table is None or table.empty:
+        return delta
+    keys = [column for column in table.columns if column != 'count']
+    split = table['date'].searchsorted(delta['date'].min())
+    recent = concat_frames([table.iloc[split:], delta])
+    recent = recent.groupby(keys, observed=True, dropna=False)['count'].sum().reset_index()
+    return concat_frames([table.iloc[:split], recent])
+
+
+# Rollup kept in step with an IncrementalLoader and persisted next to its
+# Parquet cache, so a restarted process does not need to regroup the history
+class TaskRollup:
+    def __init__(self, loader):
+        self.loader = loader
+        self.table = None
+        self.rows = 0
+        stem = os.path.splitext(os.path.basename(loader.path))[0]
+        self._table_path = os.path.join(loader.cache_dir, f"{stem}.rollup.parquet")
+        self._meta_path = os.path.join(loader.cache_dir, f"{stem}.rollup.json")
+        self._lock = threading.Lock()
+        loader.subscribe(self._on_rows)
+
+    # Rollup covering every row currently in the loader's frame
+    def current(self):
+        self.loader.refresh()
+        return self.table_for(self.loader.frame)
+
+    # Rollup covering `frame`, the loader's current frame
+    def table_for(self, frame):
+        with self._lock:
+            self._sync(len(frame))
+            return self.table
+
+    def _on_rows(self, rows, rebuilt):
+        with self._lock:
+            if rebuilt:
+                self.table = build_rollup(rows)
+                self.rows = len(rows)
+            else:
+                self._sync(len(self.loader.frame) - len(rows))
+                self.table = merge_rollup(self.table, build_rollup(rows))
+                self.rows += len(rows)
+            self._save()
+
+    # Make the table cover exactly the first `rows` rows of the loader's
+    # frame: reuse the in-memory or persisted copy when it matches,
+    # otherwise regroup those rows
+    def _sync(self, rows):
+        if self.table is not None and self.rows == rows:
+            return
+        meta = read_json(self._meta_path)
+        if meta is not None and meta.get("rows") == rows and os.path.exists(self._table_path):
+            self.table = pd.read_parquet(self._table_path)
+        else:
+            self.table = build_rollup(self.loader.frame.iloc[:rows])
+        self.rows = rows
+
+    def _save(self):
+        if not self.loader._persist:
+            return
+        os.makedirs(self.loader.cache_dir, exist_ok=True)
+        self.table.to_parquet(self._table_path + ".tmp", index=False)
+        os.replace(self._table_path + ".tmp", self._table_path)
+        write_json(self._meta_path, {"rows": self.rows})
+
+
+_shared_rollups = {}
+_shared_lock = threading.Lock()
+
+
+# Process-wide rollup attached to the shared loader of a source file
+def shared_rollup(path=DATA_PATH, cache_dir=CACHE_DIR):
+    loader = shared_loader(path, cache_dir)
+    with _shared_lock:
+        if id(loader) not in _shared_rollups:
+            _shared_rollups[id(loader)] = TaskRollup(loader)
+        return _shared_rollups[id(loader)]
+
+
+# Current rollup table for a source file, after ingesting any new rows
+def current_rollup(path=DATA_PATH, cache_dir=CACHE_DIR):
+    return shared_rollup(path, cache_dir).current()
+
+
+# ------------- Queries used by the dashboard widgets -------------
+
+def is_missed(table):
+    return table['Task_Status'].astype(str).str.lower() == "missed"
+
+
+# Restrict the rollup to a date range and to the selected statuses/types
+def filter_rollup(table, start=None, end=None, statuses=None, task_types=None):
+    lo = 0 if start is None else table['date'].searchsorted(pd.Timestamp(start), side='left')
+    hi = len(table) if end is None else table['date'].searchsorted(pd.Timestamp(end), side='right')
+    table = table.iloc[lo:hi]
+    if statuses is not None:
+        table = table[table['Task_Status'].isin(statuses)]
+    if task_types is not None:
+        table = table[table['Task_Type'].isin(task_types)]
+    return table
+
+
+# Total task count and missed task count
+def totals(table):
+    return int(table['count'].sum()), int(table['count'][is_missed(table)].sum())
+
+
+# Count of tasks with each status on a single date
+def status_counts_on(table, day):
+    lo = table['date'].searchsorted(pd.Timestamp(day), side='left')
+    hi = table['date'].searchsorted(pd.Timestamp(day), side='right')
+    return table.iloc[lo:hi].groupby('Task_Status', observed=True)['count'].sum()
+
+
+# Per-date completed and missed counts
+def daily_trend(table):
+    counts = pd.DataFrame({
+        'date': table['date'],
+        'completed': table['count'].where(table['Task_Status'] == 'Completed', 0),
+        'missed': table['count'].where(is_missed(table), 0),
+    })
+    return counts.groupby('date', sort=True)[['completed', 'missed']].sum().reset_index()
+
+
+# Day of month x hour of day task counts, as a pivot ready for a heatmap
+def heatmap_counts(table, days=None, hours=None, task_type=None):
+    day_of_month = pd.to_datetime(table['date']).dt.day
+    mask = np.ones(len(table), dtype=bool)
+    if days is not None:
+        mask &= day_of_month.isin(days).to_numpy()
+    if hours is not None:
+        mask &= table['Hour_of_Day'].isin(hours).to_numpy()
+    if task_type is not None:
+        mask &= (table['Task_Type'] == task_type).to_numpy()
+    counts = table.loc[mask, ['Hour_of_Day', 'count']].assign(Day_of_Month=day_of_month[mask])
+    return counts.pivot_table(index="Day_of_Month", columns="Hour_of_Day",
+                              values="count", aggfunc="sum", fill_value=0)
+
+
+# Weekend indicator per rollup row
+def weekend_flags(table):
+    return (pd.to_datetime(table['date']).dt.dayofweek >= 5).astype(int)
+
+
+# Task counts per (Weekend, Task_Status)
+def weekend_status(table):
+    return (table.assign(Weekend=weekend_flags(table))
+            .groupby(['Weekend', 'Task_Status'], observed=True)['count'].sum()
+            .reset_index())
+
+
+# Figures for the "Key Insights" card: hour with the most missed tasks, task
+# type with the highest miss rate, and weekend vs weekday completion rates
+def insights(table):
+    missed = is_missed(table)
+    missed_by_hour = table[missed].groupby('Hour_of_Day')['count'].sum()
+    peak_hour = missed_by_hour.idxmax() if not missed_by_hour.empty else None
+
+    by_type = pd.DataFrame({
+        'Task_Type': table['Task_Type'],
+        'count': table['count'],
+        'missed': table['count'].where(missed, 0),
+    }).groupby('Task_Type', observed=True)[['count', 'missed']].sum()
+    miss_rate = (by_type['missed'] / by_type['count']).sort_values(ascending=False, kind='stable')
+    high_risk_type = miss_rate.index[0] if not miss_rate.empty else "Unknown"
+
+    weekend = weekend_flags(table).to_numpy() == 1
+    completed = (table['Task_Status'] == 'Completed').to_numpy()
+    counts = table['count'].to_numpy()
+
+    def completion_rate(rows):
+        total = counts[rows].sum()
+        return counts[rows & completed].sum() / total * 100 if total > 0 else np.nan
+
+    return {
+        'peak_hour': peak_hour,
+        'high_risk_type': high_risk_type,
+        'weekend_completion': completion_rate(weekend),
+        'weekday_completion': completion_rate(~weekend),
+    }
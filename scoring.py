@@ -0,0 +1,80 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from features import MODEL_FEATURES, model_matrix
+
+# Output class the dashboard reports as "missed"
+MISSED_CLASS = 1
+
+# Rows featurized and scored per model call in batch mode
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+# Read an uploaded schedule of raw task records (CSV or Parquet)
+def read_schedule(data, file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in (".parquet", ".pq"):
+        return pd.read_parquet(io.BytesIO(data))
+    if extension == ".csv":
+        return pd.read_csv(io.BytesIO(data))
+    raise ValueError(f"Unsupported schedule format '{extension}'; upload a CSV or Parquet file")
+
+
+# Encoded feature frame as a contiguous float32 matrix in model column order
+def to_model_array(encoded):
+    return np.ascontiguousarray(encoded[MODEL_FEATURES].to_numpy(dtype=np.float32))
+
+
+# Low-latency inference on pre-encoded rows (columns in MODEL_FEATURES order):
+# one in-place prediction on the native booster, bypassing pandas and the
+# sklearn wrapper. Returns the predicted classes and the miss probabilities,
+# both taken from the same class-probability output.
+def predict_encoded(booster, X):
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    probabilities = booster.inplace_predict(X, validate_features=False)
+    if probabilities.ndim == 1:
+        # binary:logistic returns only P(class 1)
+        probabilities = np.column_stack([1 - probabilities, probabilities])
+    return probabilities.argmax(axis=1), probabilities[:, MISSED_CLASS]
+
+
+# Score a batch of raw task records in chunks: each chunk is featurized as a
+# whole and goes through a single booster call. `on_progress` receives the
+# fraction of rows scored after each chunk. If `explain` is given, it maps an
+# encoded chunk to per-feature attributions, added as SHAP_<feature> columns.
+def score_records(booster, records, vocabularies, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None,
+                  explain=None):
+    classes = np.empty(len(records), dtype=np.int64)
+    miss_probabilities = np.empty(len(records), dtype=np.float64)
+    attributions = np.empty((len(records), len(MODEL_FEATURES))) if explain is not None else None
+    for start in range(0, len(records), chunk_size):
+        chunk = records.iloc[start:start + chunk_size]
+        end = start + len(chunk)
+        X = to_model_array(model_matrix(chunk, vocabularies))
+        classes[start:end], miss_probabilities[start:end] = predict_encoded(booster, X)
+        if explain is not None:
+            attributions[start:end] = explain(X)
+        if on_progress is not None:
+            on_progress(end / len(records))
+
+    scored = records.copy()
+    scored['Predicted_Class'] = classes
+    scored['Miss_Probability'] = miss_probabilities
+    if attributions is not None:
+        shap_columns = pd.DataFrame(attributions, columns=[f"SHAP_{name}" for name in MODEL_FEATURES],
+                                    index=scored.index)
+        scored = pd.concat([scored, shap_columns], axis=1)
+    return scored
+
+
+# Serialize scored records in the same format as the uploaded schedule
+def export_scores(scored, file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in (".parquet", ".pq"):
+        return scored.to_parquet(index=False), "application/octet-stream"
+    return scored.to_csv(index=False).encode("utf-8"), "text/csv"
@@ -0,0 +1,181 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from features import model_matrix
+from model_bundle import BUNDLE_PATH, load_bundle
+from scoring import predict_encoded, to_model_array
+
+# Defaults for the micro-batching queue
+DEFAULT_MAX_BATCH_SIZE = 512
+DEFAULT_MAX_LATENCY_MS = 5.0
+
+
+# Collects records submitted by concurrent requests into batches and scores
+# each batch with one vectorized call. A batch is closed when it reaches
+# max_batch_size records or when its first request has waited max_latency_ms.
+class MicroBatcher:
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_latency_ms=DEFAULT_MAX_LATENCY_MS):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.batches = 0
+        self.records = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    # Queue a list of records; the returned Future resolves to one result per record
+    def submit(self, records):
+        future = Future()
+        self._queue.put((records, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_latency
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self._score(pending)
+
+    def _score(self, pending):
+        records = [record for item_records, _ in pending for record in item_records]
+        try:
+            results = self.score_batch(pd.DataFrame.from_records(records))
+        except Exception as e:
+            # One malformed request must not fail the others batched with it
+            if len(pending) > 1:
+                for item in pending:
+                    self._score([item])
+            else:
+                pending[0][1].set_exception(e)
+            return
+
+        self.batches += 1
+        self.records += len(records)
+        start = 0
+        for item_records, future in pending:
+            future.set_result(results[start:start + len(item_records)])
+            start += len(item_records)
+
+
+# Batch scoring function for a model bundle: one booster call per batch
+def bundle_scorer(bundle):
+    booster = bundle.booster
+
+    def score_batch(records):
+        classes, miss_probabilities = predict_encoded(
+            booster, to_model_array(model_matrix(records, bundle.vocabularies)))
+        return [
+            {'predicted_class': int(label), 'miss_probability': float(probability)}
+            for label, probability in zip(classes, miss_probabilities)
+        ]
+    return score_batch
+
+
+# Threaded server with a listen backlog sized for many concurrent clients
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_handler(bundle, batcher):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/health":
+                self._send(404, {'error': 'not found'})
+                return
+            self._send(200, {'status': 'ok', 'model_version': bundle.version,
+                             'batches': batcher.batches, 'records': batcher.records})
+
+        # POST /predict with one task record (object) or a list of records,
+        # using the same fields as the Prediction page form
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                self._send(400, {'error': 'request body is not valid JSON'})
+                return
+            single = isinstance(payload, dict)
+            records = [payload] if single else payload
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                self._send(400, {'error': 'expected a task record or a list of task records'})
+                return
+            if not records:
+                self._send(200, {'model_version': bundle.version, 'predictions': []})
+                return
+
+            try:
+                results = batcher.submit(records).result()
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(422, {'error': str(e)})
+                return
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+                return
+            body = {'model_version': bundle.version}
+            if single:
+                body.update(results[0])
+            else:
+                body['predictions'] = results
+            self._send(200, body)
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve task miss predictions over HTTP with micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--bundle", default=BUNDLE_PATH, help="path of the model bundle")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="most records scored in one model call")
+    parser.add_argument("--max-latency-ms", type=float, default=DEFAULT_MAX_LATENCY_MS,
+                        help="longest a request waits for its batch to fill")
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    batcher = MicroBatcher(bundle_scorer(bundle), args.max_batch_size, args.max_latency_ms)
+    server = ScoringServer((args.host, args.port), make_handler(bundle, batcher))
+    print(f"Serving model {bundle.version} on http://{args.host}:{args.port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
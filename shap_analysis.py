@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Rows explained per SHAP analysis, drawn with the class balance of the data
+DEFAULT_SAMPLE_SIZE = 2000
+# Most rows the background model is trained on
+DEFAULT_MAX_TRAIN_ROWS = 200_000
+# Finished analyses kept in memory
+MAX_CACHED_RESULTS = 8
+# Rows passed to the explainer per step, so progress can be reported
+EXPLAIN_CHUNK = 250
+
+
+# Positions of a sample of `size` rows that keeps the class proportions of `y`
+def stratified_sample(y, size, seed=42):
+    y = np.asarray(y)
+    if size >= len(y):
+        return np.arange(len(y))
+    rng = np.random.default_rng(seed)
+    positions = []
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        take = max(1, int(round(size * len(members) / len(y))))
+        positions.append(rng.choice(members, size=min(take, len(members)), replace=False))
+    return np.sort(np.concatenate(positions))
+
+
+# Rows an analysis uses: the training rows plus the 20% held out to explain
+def rows_loaded(max_train_rows=DEFAULT_MAX_TRAIN_ROWS):
+    return int(max_train_rows / 0.8)
+
+
+# One SHAP analysis: trains a classifier on the selected features, then
+# explains a stratified sample of the held-out rows
+class ShapJob:
+    def __init__(self, key, features, sample_size, max_train_rows):
+        self.key = key
+        self.features = list(features)
+        self.sample_size = sample_size
+        self.max_train_rows = max_train_rows
+        self.stage = "Queued"
+        self.progress = 0.0
+        self.shap_values = None
+        self.sample = None
+        self.error = None
+        self.done = False
+        self.future = None
+
+    def run(self, load_data):
+        try:
+            import shap
+            import xgboost as xgb
+            from sklearn.model_selection import train_test_split
+
+            self.stage, self.progress = "Preparing data", 0.05
+            X, y = load_data()
+            if y.nunique() < 2:
+                raise ValueError("The filtered data contains a single outcome; SHAP needs both missed and non-missed tasks")
+            if len(X) > rows_loaded(self.max_train_rows):
+                keep = stratified_sample(y, rows_loaded(self.max_train_rows))
+                X, y = X.iloc[keep], y.iloc[keep]
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+            self.stage, self.progress = f"Training model on {len(X_train):,} rows", 0.15
+            model = xgb.XGBClassifier(eval_metric="logloss", tree_method="hist", n_jobs=-1)
+            model.fit(X_train, y_train)
+
+            sample = X_test.iloc[stratified_sample(y_test, self.sample_size)]
+            explainer = shap.TreeExplainer(model)
+            values = []
+            for start in range(0, len(sample), EXPLAIN_CHUNK):
+                self.stage = f"Explaining {len(sample):,} sampled rows"
+                self.progress = 0.5 + 0.5 * start / len(sample)
+                values.append(explainer.shap_values(sample.iloc[start:start + EXPLAIN_CHUNK]))
+
+            self.shap_values = np.vstack(values)
+            self.sample = sample
+            self.stage, self.progress = "Done", 1.0
+        except Exception as e:
+            self.error = str(e)
+            self.stage = "Failed"
+        finally:
+            self.done = True
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shap")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+# Start (or reuse) the SHAP analysis for `key`. `key` should identify the
+# feature set, the data version and any filters applied; `load_data` returns
+# (X, y) and is only called when a new analysis actually has to run. Jobs run
+# one at a time on a background thread; finished ones stay cached, failed
+# ones too, so a failure is reported until `retry` is set. `replaces` is the
+# key the caller asked for before this one: if that job has not started yet
+# it is cancelled, so stale requests do not queue ahead of the latest one.
+def submit(key, features, load_data, sample_size=DEFAULT_SAMPLE_SIZE,
+           max_train_rows=DEFAULT_MAX_TRAIN_ROWS, retry=False, replaces=None):
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and not (retry and job.error is not None):
+            _jobs.move_to_end(key)
+            return job
+        stale = _jobs.get(replaces) if replaces != key else None
+        if stale is not None and stale.future is not None and stale.future.cancel():
+            del _jobs[replaces]
+        job = ShapJob(key, features, sample_size, max_train_rows)
+        _jobs[key] = job
+        finished = [k for k, j in _jobs.items() if j.done]
+        while len(_jobs) > MAX_CACHED_RESULTS and finished:
+            del _jobs[finished.pop(0)]
+        job.future = _executor.submit(job.run, load_data)
+    return job
+
+
+# ------------- Per-prediction explanations -------------
+
+# TreeExplainer for a model bundle's classifier; build once per bundle
+def build_explainer(bundle):
+    import shap
+    return shap.TreeExplainer(bundle.model)
+
+
+# TreeSHAP attributions of encoded rows (columns in model order) towards one
+# output class, in the model's log-odds space. Returns an (n_rows, n_features)
+# array and the class's base value; the whole batch is explained in one call.
+def explain_encoded(explainer, X, class_index):
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    values = explainer.shap_values(X)
+    base = np.atleast_1d(explainer.expected_value)
+    if isinstance(values, list):
+        # older shap releases return one array per class
+        return np.asarray(values[class_index]), float(base[class_index])
+    values = np.asarray(values)
+    if values.ndim == 3:
+        return values[:, :, class_index], float(base[class_index])
+    return values, float(base[0])
@@ -0,0 +1,222 @@
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Span instrumentation for the dashboard pages. Sections are wrapped in
+#
+#     with spans.span("dashboard.trend") as s:
+#         ...
+#         s.rows = len(trend)
+#
+# Spans are only recorded during reruns started with begin_rerun(True):
+# every rerun when DASHBOARD_SPANS=1 is set, or the reruns of sessions that
+# ticked the debug panel's checkbox. Otherwise span() returns a shared no-op
+# object. Recorded spans feed process-wide histograms, served in Prometheus
+# text format (/metrics) and JSON (/metrics.json) when DASHBOARD_METRICS_PORT
+# is set.
+
+ENABLED = os.environ.get("DASHBOARD_SPANS", "") not in ("", "0")
+METRICS_PORT = os.environ.get("DASHBOARD_METRICS_PORT")
+METRICS_HOST = "127.0.0.1"
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+# Duration histogram and row total of one span name
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.rows = 0
+
+    def observe(self, seconds, rows):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+        if rows is not None:
+            self.rows += int(rows)
+
+
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ('name', 'rows', 'depth', 'start', '_spans', '_slot')
+
+    def __init__(self, name, rows, spans):
+        self.name = name
+        self.rows = rows
+        self._spans = spans
+
+    def __enter__(self):
+        self.depth = _local.depth
+        _local.depth += 1
+        # keep the slot so spans are listed in the order they started
+        self._slot = len(self._spans)
+        self._spans.append(None)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _local.depth -= 1
+        self._spans[self._slot] = (self.name, seconds, self.rows, self.depth)
+        with _lock:
+            histogram = _histograms.get(self.name)
+            if histogram is None:
+                histogram = _histograms[self.name] = Histogram()
+            histogram.observe(seconds, self.rows)
+        return False
+
+
+# Stand-in returned while recording is off; accepts and drops `rows`
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+# Start a rerun on the current thread, recording spans if `enabled`
+def begin_rerun(enabled=ENABLED):
+    _local.spans = [] if enabled else None
+    _local.depth = 0
+
+
+# Whether the current rerun records spans
+def recording():
+    return getattr(_local, 'spans', None) is not None
+
+
+def span(name, rows=None):
+    spans = getattr(_local, 'spans', None)
+    if spans is None:
+        return NULL_SPAN
+    return Span(name, rows, spans)
+
+
+# Spans finished so far in the current rerun, in start order, as
+# (name, seconds, rows, depth)
+def rerun_spans():
+    return [entry for entry in getattr(_local, 'spans', None) or [] if entry is not None]
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+# ------------- Export -------------
+
+def metrics_json():
+    with _lock:
+        return {
+            name: {
+                'count': h.count,
+                'sum_seconds': h.total,
+                'rows': h.rows,
+                'buckets': {('+Inf' if math.isinf(b) else str(b)): c for b, c in zip(BUCKETS, h.counts)},
+            }
+            for name, h in sorted(_histograms.items())
+        }
+
+
+def prometheus_text():
+    lines = [
+        "# HELP dashboard_span_seconds Duration of instrumented dashboard sections",
+        "# TYPE dashboard_span_seconds histogram",
+    ]
+    rows = ["# HELP dashboard_span_rows_total Rows processed by instrumented dashboard sections",
+            "# TYPE dashboard_span_rows_total counter"]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'dashboard_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'dashboard_span_seconds_sum{{span="{name}"}} {h.total}')
+            lines.append(f'dashboard_span_seconds_count{{span="{name}"}} {h.count}')
+            rows.append(f'dashboard_span_rows_total{{span="{name}"}} {h.rows}')
+    return "\n".join(lines + rows) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(prometheus_text().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif self.path == '/metrics.json':
+            self._send(json.dumps(metrics_json()).encode('utf-8'), 'application/json')
+        else:
+            self.send_error(404)
+
+    def _send(self, data, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+# Serve the metrics on a local port from a background thread; later calls
+# return the running server
+def start_metrics_server(port, host=METRICS_HOST):
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="span-metrics", daemon=True).start()
+        return _server
+
+
+# ------------- Streamlit -------------
+
+# Start instrumenting a page rerun: records when DASHBOARD_SPANS is set or
+# the session enabled the debug panel, and starts the metrics endpoint if
+# DASHBOARD_METRICS_PORT is set
+def begin_page():
+    import streamlit as st
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    begin_rerun(ENABLED or st.session_state.get('debug_spans', False))
+
+
+# Opt-in sidebar panel listing the spans of the current rerun; call it last
+def debug_panel():
+    import streamlit as st
+    with st.sidebar.expander("Debug: timings", expanded=False):
+        st.checkbox("Record timing spans", key='debug_spans')
+        recorded = rerun_spans()
+        if not recorded:
+            st.caption("Tick the box to time the next rerun.")
+            return
+        st.dataframe([
+            {'span': " " * depth + name, 'ms': round(seconds * 1000, 2), 'rows': rows}
+            for name, seconds, rows, depth in recorded
+        ], hide_index=True, use_container_width=True)
@@ -0,0 +1,181 @@
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CACHE_DIR, DATA_PATH, shared_loader
+
+# Columns that get one bitmap per distinct value
+BITMAP_COLUMNS = ['Task_Status', 'Task_Type', 'Priority', 'Day_of_Month', 'Hour_of_Day']
+
+
+# Positions of the set bits between bit `lo` and `hi` of a packed bitmap;
+# `packed` holds the bytes from byte lo // 8 onwards
+def bitmap_positions(packed, lo, hi):
+    skip = lo % 8
+    bits = np.unpackbits(packed, count=hi - lo + skip)
+    return np.flatnonzero(bits[skip:]) + lo
+
+
+# Row index over a task frame. Rows are ordered by timestamp, so a date range
+# is a `searchsorted` slice of that order, and each value of a filter column
+# has a packed bitmap over the same ordering. Bitmaps of one column are OR-ed,
+# different columns AND-ed; only the bytes covering the date slice are
+# touched. The frame itself is never copied. Rows appended in timestamp order
+# extend an index (see `extended`) instead of rebuilding it.
+class TaskIndex:
+    def __init__(self, frame, time_column='Timestamp', columns=BITMAP_COLUMNS):
+        self.frame = frame
+        self.rows = len(frame)
+        times = frame[time_column].to_numpy()
+        if frame[time_column].is_monotonic_increasing:
+            self.order = None
+        else:
+            self.order = np.argsort(times, kind='stable')
+            times = times[self.order]
+        self.times = times
+        self.bitmaps = {}
+        for column in columns:
+            if column in frame.columns:
+                self.bitmaps[column] = self._build_bitmaps(frame[column])
+
+    def _build_bitmaps(self, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        if self.order is not None:
+            codes = codes[self.order]
+        return {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+    # Index over `frame`, the indexed frame followed by `rows`. When the rows
+    # continue the timestamp order, only their bits are computed: the sorted
+    # times and whole bytes of the bitmaps are copied as they are, and the
+    # index being read by other threads is left untouched. Otherwise the
+    # index is rebuilt.
+    def extended(self, rows, frame, time_column='Timestamp'):
+        times = rows[time_column].to_numpy()
+        in_order = (self.order is None and rows[time_column].is_monotonic_increasing
+                    and (not self.rows or not len(times) or times[0] >= self.times[-1]))
+        if not in_order or len(frame) != self.rows + len(rows):
+            return TaskIndex(frame, time_column, list(self.bitmaps))
+        index = copy.copy(self)
+        index.frame = frame
+        index.rows = self.rows + len(rows)
+        index.times = np.concatenate([self.times, times])
+        index.bitmaps = {column: self._extend_bitmaps(bitmaps, rows[column])
+                         for column, bitmaps in self.bitmaps.items()}
+        return index
+
+    # Bitmaps of a column with the bits of appended `values`; the last,
+    # partly filled byte is unpacked and repacked with them
+    def _extend_bitmaps(self, bitmaps, values):
+        full, carry = divmod(self.rows, 8)
+        codes, uniques = pd.factorize(values, sort=True)
+        new_codes = {value: code for code, value in enumerate(uniques)}
+        extended = {}
+        for value in sorted(set(bitmaps) | set(new_codes)):
+            old = bitmaps.get(value)
+            if old is None:
+                old = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+            bits = (codes == new_codes[value]) if value in new_codes else np.zeros(len(codes), dtype=bool)
+            tail = np.concatenate([np.unpackbits(old[full:], count=carry), bits.astype(np.uint8)])
+            extended[value] = np.concatenate([old[:full], np.packbits(tail)])
+        return extended
+
+    # Values of a column that have a bitmap
+    def values(self, column):
+        return list(self.bitmaps[column])
+
+    # Start/end of the sorted slice for an inclusive date range
+    def date_slice(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start)), 'left'))
+        if end is None:
+            hi = self.rows
+        else:
+            next_day = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+            hi = int(np.searchsorted(self.times, next_day, 'left'))
+        return lo, hi
+
+    # Packed bitmap of the rows whose `column` is any of `selected`, limited
+    # to bytes `first` to `last`
+    def any_of(self, column, selected, first=0, last=None):
+        bitmaps = self.bitmaps[column]
+        last = (self.rows + 7) // 8 if last is None else last
+        result = np.zeros(last - first, dtype=np.uint8)
+        for value in selected:
+            if value in bitmaps:
+                np.bitwise_or(result, bitmaps[value][first:last], out=result)
+        return result
+
+    # Frame row positions (in timestamp order) in the date range that match
+    # every filter; `filters` maps a column to the accepted values, None
+    # meaning no restriction
+    def positions(self, start=None, end=None, **filters):
+        lo, hi = self.date_slice(start, end)
+        active = [(column, selected) for column, selected in filters.items() if selected is not None]
+        if not active:
+            sorted_positions = np.arange(lo, hi)
+        else:
+            first, last = lo // 8, (hi + 7) // 8
+            mask = None
+            for column, selected in active:
+                bits = self.any_of(column, selected, first, last)
+                mask = bits if mask is None else np.bitwise_and(mask, bits, out=mask)
+            sorted_positions = bitmap_positions(mask, lo, hi)
+        return sorted_positions if self.order is None else self.order[sorted_positions]
+
+    def count(self, start=None, end=None, **filters):
+        return len(self.positions(start, end, **filters))
+
+    # Rows at `positions`, materialized only when a consumer needs them
+    def take(self, positions, columns=None):
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.iloc[positions]
+
+
+# Index kept in step with an IncrementalLoader: built when first needed,
+# then extended with each batch of appended rows and dropped after a rebuild
+class SharedIndex:
+    def __init__(self, loader):
+        self.loader = loader
+        self.index = None
+        self._lock = threading.Lock()
+        loader.subscribe(self._on_rows)
+
+    def _on_rows(self, rows, rebuilt):
+        with self._lock:
+            if self.index is None:
+                return
+            if rebuilt or self.index.rows + len(rows) != len(self.loader.frame):
+                self.index = None
+            else:
+                self.index = self.index.extended(rows, self.loader.frame)
+
+    # Index over `frame`, the loader's current frame
+    def index_for(self, frame):
+        with self._lock:
+            if self.index is None or self.index.frame is not frame:
+                self.index = TaskIndex(frame)
+            return self.index
+
+    # Index over the loader's frame, after ingesting any new rows
+    def current(self):
+        self.loader.refresh()
+        return self.index_for(self.loader.frame)
+
+
+_shared_indexes = {}
+_shared_lock = threading.Lock()
+
+
+# Process-wide index attached to the shared loader of a source file
+def shared_index(path=DATA_PATH, cache_dir=CACHE_DIR):
+    loader = shared_loader(path, cache_dir)
+    with _shared_lock:
+        if id(loader) not in _shared_indexes:
+            _shared_indexes[id(loader)] = SharedIndex(loader)
+        return _shared_indexes[id(loader)]
+
+
+# Index over the shared loader's current frame, after ingesting any new rows
+def current_index(path=DATA_PATH, cache_dir=CACHE_DIR):
+    return shared_index(path, cache_dir).current()
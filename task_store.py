@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Shared, persistent store for the To-Do list: one SQLite database in WAL
+# mode, so any number of sessions (and processes) read while one writes.
+# Priorities are stored as their rank (High first), so the indexes hand out
+# rows already in display order and a page is a single index range scan.
+
+TASKS_DB_PATH = os.environ.get("TASKS_DB_PATH", "tasks.db")
+STATUSES = ['Completed', 'Delayed', 'Missed']
+PRIORITIES = ['High', 'Medium', 'Low']
+DEFAULT_PAGE_SIZE = 50
+# Seconds a writer waits for another writer's transaction to finish
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_priority ON tasks (priority, created_at, id);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, priority, created_at, id);
+CREATE INDEX IF NOT EXISTS tasks_by_created ON tasks (created_at);
+"""
+
+PAGE_COLUMNS = ['ID', 'Task', 'Priority', 'Status', 'Created']
+
+
+def priority_rank(priority):
+    return PRIORITIES.index(priority)
+
+
+# WHERE clause and parameters selecting tasks in `statuses` and `priorities`
+# (None or empty: no restriction)
+def _where(statuses, priorities):
+    clauses, params = [], []
+    if statuses:
+        clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+        params += list(statuses)
+    if priorities:
+        clauses.append(f"priority IN ({','.join('?' * len(priorities))})")
+        params += [priority_rank(p) for p in priorities]
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class TaskStore:
+    def __init__(self, path=TASKS_DB_PATH):
+        self.path = path
+        self._idle = []
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _open(self):
+        # autocommit: write transactions are opened explicitly in _write
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # A pooled connection; each one is used by a single thread at a time
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._idle.append(conn)
+
+    # One write transaction; BEGIN IMMEDIATE takes the write lock up front so
+    # concurrent writers queue on the busy timeout instead of failing midway
+    @contextmanager
+    def _write(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+    # ------------- Writes -------------
+
+    def add(self, task, status, priority):
+        return self.add_many([(task, status, priority)])[0]
+
+    # Insert (task, status, priority) rows in one transaction; returns their ids
+    def add_many(self, rows):
+        now = time.time()
+        ids = []
+        with self._write() as conn:
+            for task, status, priority in rows:
+                cursor = conn.execute(
+                    "INSERT INTO tasks (task, status, priority, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (task, status, priority_rank(priority), now, now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    # Apply (id, status, priority) updates in one transaction; returns the
+    # number of tasks changed
+    def update_many(self, updates):
+        now = time.time()
+        params = [(status, priority_rank(priority), now, task_id, status, priority_rank(priority))
+                  for task_id, status, priority in updates]
+        if not params:
+            return 0
+        with self._write() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE tasks SET status = ?, priority = ?, updated_at = ? "
+                "WHERE id = ? AND (status != ? OR priority != ?)", params)
+            return conn.total_changes - before
+
+    # Set the status of every task in `statuses` and `priorities` (None or
+    # empty: no restriction) in one statement; returns the number changed
+    def set_status(self, status, statuses=None, priorities=None):
+        where, params = _where(statuses, priorities)
+        where = (where + " AND" if where else " WHERE") + " status != ?"
+        with self._write() as conn:
+            cursor = conn.execute(f"UPDATE tasks SET status = ?, updated_at = ?{where}",
+                                  [status, time.time()] + params + [status])
+            return cursor.rowcount
+
+    def delete_many(self, ids):
+        with self._write() as conn:
+            conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in ids])
+
+    # ------------- Reads -------------
+
+    def count(self, statuses=None, priorities=None):
+        where, params = _where(statuses, priorities)
+        with self._connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM tasks{where}", params).fetchone()[0]
+
+    # Tasks by priority (High first) then creation time, `page_size` rows
+    # from page `page` (0-based), as a DataFrame with PAGE_COLUMNS
+    def page(self, page=0, page_size=DEFAULT_PAGE_SIZE, statuses=None, priorities=None):
+        where, params = _where(statuses, priorities)
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, task, priority, status, created_at FROM tasks{where} "
+                "ORDER BY priority, created_at, id LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size]).fetchall()
+        frame = pd.DataFrame(rows, columns=PAGE_COLUMNS)
+        frame['Priority'] = pd.Categorical.from_codes(frame['Priority'].astype(int), categories=PRIORITIES)
+        frame['Created'] = pd.to_datetime(frame['Created'], unit='s')
+        return frame
@@ -0,0 +1,122 @@
+import os
+
+import pandas as pd
+
+from data_loader import IncrementalLoader, derive_columns, read_source
+from rollups import TaskRollup, build_rollup
+
+HEADER = "Timestamp,Facility_ID,Task_Type,Priority,Task_Status\n"
+TASK_TYPES = ['Cleaning', 'Inspection', 'Repair']
+STATUSES = ['Completed', 'Delayed', 'Missed']
+
+
+# CSV lines of `count` tasks, 17 minutes apart from row `start` on
+def task_lines(start, count):
+    lines = []
+    for row in range(start, start + count):
+        timestamp = pd.Timestamp('2024-01-01') + pd.Timedelta(minutes=17 * row)
+        lines.append(f"{timestamp},{row % 7},{TASK_TYPES[row % 3]},High,{STATUSES[row % 5 % 3]}\n")
+    return "".join(lines)
+
+
+def write(path, text, mode="w"):
+    with open(path, mode) as f:
+        f.write(text)
+    # a later mtime even when the writes land in the same clock tick
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def make_loader(tmp_path, rows):
+    path = str(tmp_path / "tasks.csv")
+    write(path, HEADER + task_lines(0, rows))
+    return path, IncrementalLoader(path, str(tmp_path / "cache"))
+
+
+def assert_matches_source(loader):
+    expected = derive_columns(read_source(loader.path))
+    pd.testing.assert_frame_equal(loader.frame.reset_index(drop=True), expected, check_categorical=False)
+
+
+def test_appended_rows_are_ingested(tmp_path):
+    path, loader = make_loader(tmp_path, 100)
+    assert len(loader.refresh()) == 100
+    write(path, task_lines(100, 10), mode="a")
+    assert len(loader.refresh()) == 10
+    assert len(loader.refresh()) == 0
+    assert_matches_source(loader)
+
+
+def test_partial_line_is_held_back(tmp_path):
+    path, loader = make_loader(tmp_path, 50)
+    loader.refresh()
+    line = task_lines(51, 1)
+    write(path, task_lines(50, 1) + line[:10], mode="a")
+    assert len(loader.refresh()) == 1
+    write(path, line[10:], mode="a")
+    assert len(loader.refresh()) == 1
+    assert_matches_source(loader)
+
+
+def test_restart_resumes_from_the_watermark(tmp_path):
+    path, loader = make_loader(tmp_path, 100)
+    loader.refresh()
+    write(path, task_lines(100, 5), mode="a")
+    restarted = IncrementalLoader(path, str(tmp_path / "cache"))
+    assert len(restarted.refresh()) == 5
+    assert_matches_source(restarted)
+
+
+# An in-place edit far from both ends of a file over 128 KB, keeping its
+# size, must not be missed
+def test_mid_file_edit_forces_a_rebuild(tmp_path):
+    path, loader = make_loader(tmp_path, 6000)
+    loader.refresh()
+    with open(path) as f:
+        text = f.read()
+    assert len(text) > 128 * 1024
+    middle = text.index("\n", len(text) // 2) + 1
+    row = text[middle:text.index("\n", middle)]
+    timestamp, facility, rest = row.split(",", 2)
+    edited = f"{timestamp},{(int(facility) + 1) % 10},{rest}"
+    write(path, text[:middle] + edited + text[middle + len(row):])
+    assert len(loader.refresh()) == 6000
+    assert_matches_source(loader)
+
+    with open(path) as f:
+        text = f.read()
+    write(path, text.replace(edited, row) + task_lines(6000, 3))
+    loader.refresh()
+    assert_matches_source(loader)
+
+
+# A last row without a newline is loaded, and reloaded if it turns out to
+# have been cut short by a writer
+def test_unterminated_last_row(tmp_path):
+    path = str(tmp_path / "tasks.csv")
+    lines = task_lines(0, 20)
+    write(path, HEADER + lines[:-1])
+    loader = IncrementalLoader(path, str(tmp_path / "cache"))
+    assert len(loader.refresh()) == 20
+    write(path, "\n" + task_lines(20, 2), mode="a")
+    assert len(loader.refresh()) == 2
+    assert_matches_source(loader)
+
+    cut = len(lines) - 10
+    write(path, HEADER + lines[:cut])
+    loader.refresh()
+    write(path, lines[cut:], mode="a")
+    assert len(loader.refresh()) == 20
+    assert_matches_source(loader)
+
+
+def test_rollup_follows_appended_rows(tmp_path):
+    path, loader = make_loader(tmp_path, 500)
+    rollup = TaskRollup(loader)
+    rollup.current()
+    # the new rows continue the last day, so existing rollup rows are merged
+    write(path, task_lines(500, 200), mode="a")
+    table = rollup.current()
+    expected = build_rollup(loader.frame)
+    pd.testing.assert_frame_equal(table.reset_index(drop=True), expected, check_categorical=False)
+    assert table['count'].sum() == 700
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from features import build_features
+
+RECORD = {
+    'Facility_ID': 3, 'Task_Type': 'Cleaning', 'Priority': 'High', 'Time_Slot': 'Morning',
+    'Task_Frequency': 2, 'Workload_Estimate': 4.0, 'Delay_Duration': 10.0, 'Previous_Task_Delay': 5.0,
+    'Rolling_Avg_Delay': 7.5, 'Scheduled_Time': '2024-03-04 08:00:00',
+    'Actual_Start_Time': '08:30', 'Actual_Completion_Time': '10:00',
+}
+
+
+def test_times_of_day_use_the_scheduled_date():
+    features = build_features(pd.DataFrame([RECORD]))
+    assert features['Start_Duration'].iloc[0] == 30.0
+    assert features['Actual_Duration'].iloc[0] == 90.0
+
+
+# A full datetime in one row must not change how another row's time of day
+# is read (the scoring service batches unrelated requests together)
+def test_mixed_time_formats_in_one_batch():
+    full = {**RECORD, 'Scheduled_Time': '2024-03-05 09:00:00',
+            'Actual_Start_Time': '2024-03-05 09:15:00', 'Actual_Completion_Time': '2024-03-05 11:15:00'}
+    features = build_features(pd.DataFrame([RECORD, full]))
+    assert features['Start_Duration'].tolist() == [30.0, 15.0]
+    assert features['Actual_Duration'].tolist() == [90.0, 120.0]
+    assert features['Actual_Start_Hour'].tolist() == [8, 9]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import concat_frames
+from task_index import TaskIndex
+
+
+def task_frame(start, count, task_types):
+    rng = np.random.default_rng(start)
+    frame = pd.DataFrame({
+        'Timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(start, start + count) * 13, unit='min'),
+        'Task_Status': pd.Categorical(rng.choice(['Completed', 'Delayed', 'Missed'], count)),
+        'Task_Type': pd.Categorical(rng.choice(task_types, count)),
+    })
+    frame.index = pd.RangeIndex(start, start + count)
+    return frame
+
+
+def assert_same_positions(index, expected):
+    for filters in [{}, {'Task_Status': ['Missed']}, {'Task_Type': ['Audit', 'Repair']},
+                    {'Task_Status': ['Completed', 'Delayed'], 'Task_Type': ['Cleaning']}]:
+        for start, end in [(None, None), ('2024-01-02', '2024-01-05')]:
+            np.testing.assert_array_equal(index.positions(start, end, **filters),
+                                          expected.positions(start, end, **filters))
+
+
+# Appended rows (with a value not seen before) extend the bitmaps to the
+# same result as indexing the whole frame
+def test_extended_index_matches_a_rebuild():
+    frame = task_frame(0, 1003, ['Cleaning', 'Repair'])
+    index = TaskIndex(frame)
+    for start, count in [(1003, 5), (1008, 700)]:
+        rows = task_frame(start, count, ['Audit', 'Cleaning', 'Repair'])
+        frame = concat_frames([frame, rows])
+        index = index.extended(rows, frame)
+        assert index.rows == len(frame)
+        assert_same_positions(index, TaskIndex(frame))
@@ -0,0 +1,223 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import CATEGORICAL_FEATURES, MODEL_FEATURES, RAW_FIELDS, model_matrix
+from model_bundle import BUNDLE_PATH, build_bundle, load_bundle, save_bundle
+from scoring import MISSED_CLASS, to_model_array
+
+# Trains the task outcome model from raw task records (the RAW_FIELDS of the
+# prediction form plus Task_Status), e.g. data written by
+# `generate_data.py --model-fields`, and writes the model bundle. Features go
+# through the same pipeline as inference (features.model_matrix). Training
+# uses XGBoost's histogram method on all cores and stops early on a
+# validation set made of the most recent rows. Examples:
+#
+#     python train.py --data facility_tasks --output models/task_model_bundle.joblib
+#     python train.py --data facility_tasks --continue   # boost on rows newer than the bundle
+
+# Task_Status of each model class; the dashboard reads MISSED_CLASS as missed
+TARGET_CLASSES = ['Completed', 'Missed', 'Delayed']
+assert TARGET_CLASSES[MISSED_CLASS] == 'Missed'
+
+# Column ordering rows in time, for the validation split and continued training
+TIME_COLUMN = 'Scheduled_Time'
+
+DEFAULT_PARAMS = {
+    'objective': 'multi:softprob',
+    'num_class': len(TARGET_CLASSES),
+    'tree_method': 'hist',
+    'eval_metric': 'mlogloss',
+    'eta': 0.1,
+    'max_depth': 6,
+    'min_child_weight': 1,
+    'subsample': 0.9,
+    'colsample_bytree': 0.9,
+    'max_bin': 256,
+    'lambda': 1,
+    'seed': 0,
+}
+DEFAULT_ROUNDS = 1000
+DEFAULT_EARLY_STOPPING = 30
+# Most recent share of the rows held out for early stopping
+DEFAULT_VALID_FRACTION = 0.2
+# Rows featurized at a time
+FEATURE_CHUNK_ROWS = 1_000_000
+
+
+# Raw task records of a CSV file or Parquet dataset, sorted by TIME_COLUMN;
+# only rows scheduled after `since` when given
+def read_records(source, since=None):
+    columns = RAW_FIELDS + ['Task_Status']
+    if os.path.isdir(source) or source.endswith(".parquet"):
+        import partitions
+
+        frame = partitions.read_partitioned(source, start=since, columns=columns)[columns]
+    else:
+        frame = pd.read_csv(source, usecols=columns,
+                            parse_dates=['Scheduled_Time', 'Actual_Start_Time', 'Actual_Completion_Time'])
+    if since is not None:
+        frame = frame[frame[TIME_COLUMN] > pd.Timestamp(since)]
+    return frame.sort_values(TIME_COLUMN, ignore_index=True, kind='stable')
+
+
+# Labels of each categorical feature, sorted as a LabelEncoder would
+def fit_vocabularies(records):
+    return {column: sorted(records[column].astype(str).unique()) for column in CATEGORICAL_FEATURES}
+
+
+# Encoded float32 feature matrix and class labels of `records`
+def encode(records, vocabularies, chunk_rows=FEATURE_CHUNK_ROWS):
+    X = np.empty((len(records), len(MODEL_FEATURES)), dtype=np.float32)
+    for start in range(0, len(records), chunk_rows):
+        chunk = records.iloc[start:start + chunk_rows]
+        X[start:start + len(chunk)] = to_model_array(model_matrix(chunk, vocabularies))
+    labels = pd.Categorical(records['Task_Status'].astype(str), categories=TARGET_CLASSES)
+    if (labels.codes < 0).any():
+        raise ValueError(f"Task_Status values outside {TARGET_CLASSES}")
+    return X, labels.codes.astype(np.int32)
+
+
+# Split rows (sorted by time) into training and validation sets, the
+# validation set being the most recent `valid_fraction` of them
+def time_split(X, y, valid_fraction=DEFAULT_VALID_FRACTION):
+    split = int(len(y) * (1 - valid_fraction))
+    if split == 0 or split == len(y):
+        raise ValueError(f"Too few rows ({len(y)}) for a validation split")
+    return (X[:split], y[:split]), (X[split:], y[split:])
+
+
+# Training and validation DMatrix; the hist method bins features once into
+# a QuantileDMatrix, and the validation set reuses the training bins
+def build_matrices(train, valid, max_bin=DEFAULT_PARAMS['max_bin']):
+    import xgboost as xgb
+
+    dtrain = xgb.QuantileDMatrix(train[0], train[1], feature_names=MODEL_FEATURES, max_bin=max_bin)
+    dvalid = xgb.QuantileDMatrix(valid[0], valid[1], feature_names=MODEL_FEATURES, max_bin=max_bin, ref=dtrain)
+    return dtrain, dvalid
+
+
+def accuracy(booster, dmatrix):
+    probabilities = booster.predict(dmatrix)
+    return float((probabilities.argmax(axis=1) == dmatrix.get_label()).mean())
+
+
+# Boost up to `rounds` trees (added to `previous`, a Booster, when given)
+# with early stopping on `dvalid`. Returns the booster cut at its best
+# iteration and the validation results.
+def fit(dtrain, dvalid, params=None, rounds=DEFAULT_ROUNDS, early_stopping=DEFAULT_EARLY_STOPPING,
+        threads=None, previous=None, verbose=False):
+    import xgboost as xgb
+
+    params = {**DEFAULT_PARAMS, **(params or {}), 'nthread': threads or os.cpu_count() or 1}
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, evals=[(dvalid, 'valid')],
+                        early_stopping_rounds=early_stopping, xgb_model=previous,
+                        verbose_eval=10 if verbose else False)
+    # trees past the best iteration would otherwise be used by inplace_predict
+    booster = booster[:booster.best_iteration + 1]
+    return booster, {
+        'best_iteration': int(booster.num_boosted_rounds()) - 1,
+        'valid_mlogloss': float(booster.eval(dvalid).split(':')[-1]),
+        'valid_accuracy': accuracy(booster, dvalid),
+    }
+
+
+# XGBClassifier around a trained booster, as build_bundle expects
+def as_classifier(booster):
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
+
+
+# Train on `source` and save the bundle to `output`. With `continue_from`
+# (a bundle path), boosting continues from that model on the rows newer than
+# the data it was trained on (or than `since`), keeping its vocabularies.
+# `metadata` is added to the bundle's metadata.
+def train(source, output=BUNDLE_PATH, params=None, rounds=DEFAULT_ROUNDS, early_stopping=DEFAULT_EARLY_STOPPING,
+          valid_fraction=DEFAULT_VALID_FRACTION, threads=None, continue_from=None, since=None, verbose=False,
+          metadata=None):
+    started = time.perf_counter()
+    previous = None
+    if continue_from is not None:
+        previous = load_bundle(continue_from)
+        since = since or previous.metadata.get('trained_until')
+        params = {**previous.metadata.get('params', {}), **(params or {})}
+    params = {**DEFAULT_PARAMS, **(params or {})}
+
+    records = read_records(source, since)
+    if records.empty:
+        raise ValueError(f"No task records in '{source}'" + (f" after {since}" if since else ""))
+    vocabularies = previous.vocabularies if previous is not None else fit_vocabularies(records)
+    X, y = encode(records, vocabularies)
+    dtrain, dvalid = build_matrices(*time_split(X, y, valid_fraction), max_bin=params['max_bin'])
+    del X, y
+
+    booster, results = fit(dtrain, dvalid, params, rounds, early_stopping, threads,
+                           previous.booster if previous is not None else None, verbose)
+    metadata = {
+        **(metadata or {}),
+        'source': 'train.py',
+        'data': os.path.abspath(source),
+        'params': params,
+        'train_rows': int(dtrain.num_row()),
+        'valid_rows': int(dvalid.num_row()),
+        'trained_until': str(records[TIME_COLUMN].iloc[-1]),
+        'training_seconds': round(time.perf_counter() - started, 1),
+        **results,
+    }
+    if previous is not None:
+        metadata['continued_from'] = previous.version
+        metadata['since'] = str(since) if since is not None else None
+    bundle = build_bundle(as_classifier(booster), vocabularies, metadata=metadata)
+    save_bundle(bundle, output)
+    return bundle
+
+
+# key=value overrides of the booster parameters, with numeric values parsed
+def parse_params(pairs):
+    params = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        params[key] = value
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the task outcome model and write the model bundle")
+    parser.add_argument("--data", required=True, help="CSV file or Parquet dataset of raw task records")
+    parser.add_argument("--output", default=BUNDLE_PATH)
+    parser.add_argument("--continue", dest="continue_training", action="store_true",
+                        help="Continue boosting the model in --bundle on rows newer than it was trained on")
+    parser.add_argument("--bundle", default=None, help="Bundle to continue from (default: --output)")
+    parser.add_argument("--since", default=None, help="With --continue, train on rows scheduled after this time")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Most boosting rounds to add")
+    parser.add_argument("--early-stopping", type=int, default=DEFAULT_EARLY_STOPPING)
+    parser.add_argument("--valid-fraction", type=float, default=DEFAULT_VALID_FRACTION)
+    parser.add_argument("--threads", type=int, default=None, help="Default: all cores")
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE", help="Booster parameter override")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    continue_from = (args.bundle or args.output) if args.continue_training else None
+    bundle = train(args.data, args.output, parse_params(args.param), args.rounds, args.early_stopping,
+                   args.valid_fraction, args.threads, continue_from, args.since, args.verbose)
+    metadata = bundle['metadata']
+    print(f"Model bundle {bundle['version']} ({metadata['best_iteration'] + 1} trees, "
+          f"validation accuracy {metadata['valid_accuracy']:.1%}, mlogloss {metadata['valid_mlogloss']:.4f}) "
+          f"trained on {metadata['train_rows']:,} rows in {metadata['training_seconds']}s "
+          f"has been saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
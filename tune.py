@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+import train
+from model_bundle import BUNDLE_PATH
+
+# Hyperparameter search for the task outcome model by successive halving:
+# every configuration is boosted for a few rounds, the best third (by
+# validation log loss) goes on to boost `factor` times longer, and so on,
+# so poor configurations are cut after a handful of trees. Trials run in a
+# process pool sized to the machine; each surviving trial resumes from its
+# own booster rather than starting over. The encoded data is written once
+# to memory-mapped .npy files and every worker builds the binned training
+# matrices once per max_bin, reusing them for all its trials. The best
+# configuration is then trained by train.py and written to the model bundle,
+# along with the search results. Example:
+#
+#     python tune.py --data facility_tasks --trials 27 --report tuning.json
+
+# Values drawn for each configuration
+SEARCH_SPACE = {
+    'eta': [0.03, 0.05, 0.1, 0.2, 0.3],
+    'max_depth': [3, 4, 6, 8, 10],
+    'min_child_weight': [1, 3, 5, 10],
+    'subsample': [0.6, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'max_bin': [64, 128, 256],
+    'lambda': [0.5, 1, 2, 5],
+}
+DEFAULT_TRIALS = 27
+# Boosting rounds of the first rung; each rung multiplies them by `factor`
+DEFAULT_MIN_ROUNDS = 20
+DEFAULT_MAX_ROUNDS = 540
+DEFAULT_FACTOR = 3
+# Single-row predictions timed per trial, and rows of the batch timing
+LATENCY_CALLS = 200
+BATCH_ROWS = 10_000
+
+
+# `trials` distinct configurations drawn from SEARCH_SPACE, the default
+# training parameters first
+def sample_configs(trials, seed=0):
+    rng = np.random.default_rng(seed)
+    configs = [{key: train.DEFAULT_PARAMS[key] for key in SEARCH_SPACE}]
+    seen = {tuple(sorted(configs[0].items()))}
+    attempts = 0
+    while len(configs) < trials and attempts < trials * 100:
+        attempts += 1
+        config = {key: values[rng.integers(len(values))] for key, values in SEARCH_SPACE.items()}
+        config = {key: value.item() if hasattr(value, 'item') else value for key, value in config.items()}
+        if tuple(sorted(config.items())) not in seen:
+            seen.add(tuple(sorted(config.items())))
+            configs.append(config)
+    return configs
+
+
+# Rounds each rung boosts a trial to, e.g. 20, 60, 180, 540
+def rung_rounds(min_rounds=DEFAULT_MIN_ROUNDS, max_rounds=DEFAULT_MAX_ROUNDS, factor=DEFAULT_FACTOR):
+    rounds = [min_rounds]
+    while rounds[-1] * factor <= max_rounds:
+        rounds.append(rounds[-1] * factor)
+    return rounds
+
+
+# ------------- Worker processes -------------
+
+_data = {}
+_matrices = {}
+
+
+def _init_worker(data_dir, threads):
+    for name in ('X_train', 'y_train', 'X_valid', 'y_valid'):
+        _data[name] = np.load(os.path.join(data_dir, name + ".npy"), mmap_mode='r')
+    _data['threads'] = threads
+
+
+# Training and validation matrices binned with `max_bin`, built once per
+# worker and reused by every trial with that value
+def worker_matrices(max_bin):
+    if max_bin not in _matrices:
+        _matrices[max_bin] = train.build_matrices((_data['X_train'], _data['y_train']),
+                                                  (_data['X_valid'], _data['y_valid']), max_bin)
+    return _matrices[max_bin]
+
+
+# Median single-row and per-batch prediction time, as the dashboard
+# predicts: inplace_predict on float32 rows
+def measure_latency(booster, X):
+    row = np.ascontiguousarray(X[:1])
+    booster.inplace_predict(row)
+    single = []
+    for _ in range(LATENCY_CALLS):
+        start = time.perf_counter()
+        booster.inplace_predict(row)
+        single.append(time.perf_counter() - start)
+    batch = np.ascontiguousarray(X[:BATCH_ROWS])
+    start = time.perf_counter()
+    booster.inplace_predict(batch)
+    return float(np.median(single)) * 1e6, (time.perf_counter() - start) * 1000
+
+
+# Worker: boost one trial up to `rounds` trees (resuming from its previous
+# booster) and evaluate it
+def run_trial(task):
+    import xgboost as xgb
+
+    trial, config, rounds, booster_raw, early_stopping = task
+    dtrain, dvalid = worker_matrices(config['max_bin'])
+    previous = None
+    if booster_raw is not None:
+        previous = xgb.Booster()
+        previous.load_model(bytearray(booster_raw))
+    started = time.perf_counter()
+    # a resumed booster was cut at its best iteration; early stopping ends
+    # the rung quickly when it no longer improves
+    added = rounds - (previous.num_boosted_rounds() if previous is not None else 0)
+    booster, results = train.fit(dtrain, dvalid, config, added, early_stopping, _data['threads'], previous)
+    single_us, batch_ms = measure_latency(booster, _data['X_valid'])
+    return trial, bytes(booster.save_raw('ubj')), {
+        **results,
+        'rounds': rounds,
+        'trees': int(booster.num_boosted_rounds()),
+        'seconds': time.perf_counter() - started,
+        'single_row_us': single_us,
+        'batch_ms': batch_ms,
+    }
+
+
+# ------------- Search -------------
+
+# Successive halving over `configs`. Returns one result per configuration
+# (its last evaluation) with the rung it reached, best first.
+def successive_halving(data_dir, configs, rungs, factor=DEFAULT_FACTOR, workers=None,
+                       early_stopping=train.DEFAULT_EARLY_STOPPING, on_result=None):
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    boosters = {}
+    results = {trial: {'trial': trial, 'config': config, 'rung': None} for trial, config in enumerate(configs)}
+    alive = list(range(len(configs)))
+    with Pool(workers, initializer=_init_worker, initargs=(data_dir, threads)) as pool:
+        for rung, rounds in enumerate(rungs):
+            tasks = [(trial, configs[trial], rounds, boosters.get(trial), early_stopping) for trial in alive]
+            for trial, booster_raw, metrics in pool.imap_unordered(run_trial, tasks):
+                boosters[trial] = booster_raw
+                results[trial].update(metrics, rung=rung)
+                if on_result is not None:
+                    on_result(results[trial])
+            alive.sort(key=lambda trial: results[trial]['valid_mlogloss'])
+            # drop the boosters of trials that stop here
+            keep = max(1, len(alive) // factor)
+            for trial in alive[keep:]:
+                boosters.pop(trial, None)
+            alive = alive[:keep]
+    return sorted(results.values(), key=lambda result: (-result['rung'], result['valid_mlogloss']))
+
+
+# Trials on the accuracy/latency front: no other trial is both more
+# accurate and faster on single-row predictions
+def pareto_front(results):
+    return [result['trial'] for result in results
+            if not any(other['valid_accuracy'] > result['valid_accuracy']
+                       and other['single_row_us'] < result['single_row_us'] for other in results)]
+
+
+def format_config(config):
+    return " ".join(f"{key}={value}" for key, value in config.items())
+
+
+def print_report(results):
+    front = set(pareto_front(results))
+    print(f"{'trial':>5} {'rung':>4} {'trees':>5} {'accuracy':>8} {'mlogloss':>8} {'1-row us':>8} "
+          f"{'10k ms':>7}  config")
+    for result in results:
+        marker = "*" if result['trial'] in front else " "
+        print(f"{result['trial']:>5} {result['rung']:>4} {result['trees']:>5} {result['valid_accuracy']:>8.2%} "
+              f"{result['valid_mlogloss']:>8.4f} {result['single_row_us']:>8.1f} {result['batch_ms']:>7.1f}{marker} "
+              f"{format_config(result['config'])}")
+    print("* accuracy/latency front: no other trial is both more accurate and faster")
+
+
+def tune(source, output=BUNDLE_PATH, trials=DEFAULT_TRIALS, min_rounds=DEFAULT_MIN_ROUNDS,
+         max_rounds=DEFAULT_MAX_ROUNDS, factor=DEFAULT_FACTOR, workers=None, seed=0,
+         valid_fraction=train.DEFAULT_VALID_FRACTION, on_result=None):
+    started = time.perf_counter()
+    records = train.read_records(source)
+    X, y = train.encode(records, train.fit_vocabularies(records))
+    del records
+    (X_train, y_train), (X_valid, y_valid) = train.time_split(X, y, valid_fraction)
+    configs = sample_configs(trials, seed)
+    rungs = rung_rounds(min_rounds, max_rounds, factor)
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name, array in (('X_train', X_train), ('y_train', y_train), ('X_valid', X_valid), ('y_valid', y_valid)):
+            np.save(os.path.join(data_dir, name + ".npy"), array)
+        del X, y, X_train, y_train, X_valid, y_valid
+        results = successive_halving(data_dir, configs, rungs, factor, workers, on_result=on_result)
+    search_seconds = time.perf_counter() - started
+
+    best = results[0]
+    summary = {
+        'trials': len(configs),
+        'rungs': rungs,
+        'search_seconds': round(search_seconds, 1),
+        'best_trial': best['trial'],
+        'best_config': best['config'],
+        'best_valid_mlogloss': best['valid_mlogloss'],
+    }
+    bundle = train.train(source, output, best['config'], valid_fraction=valid_fraction, metadata={'tuning': summary})
+    return results, bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the model's hyperparameters and write the best model bundle")
+    parser.add_argument("--data", required=True, help="CSV file or Parquet dataset of raw task records")
+    parser.add_argument("--output", default=BUNDLE_PATH)
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument("--min-rounds", type=int, default=DEFAULT_MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=DEFAULT_MAX_ROUNDS)
+    parser.add_argument("--factor", type=int, default=DEFAULT_FACTOR)
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per core")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="Write the trial results to this JSON file")
+    args = parser.parse_args()
+
+    def progress(result):
+        print(f"trial {result['trial']:>3} rung {result['rung']}: {result['trees']} trees, "
+              f"mlogloss {result['valid_mlogloss']:.4f}, accuracy {result['valid_accuracy']:.2%}", flush=True)
+
+    results, bundle = tune(args.data, args.output, args.trials, args.min_rounds, args.max_rounds, args.factor,
+                           args.workers, args.seed, on_result=progress)
+    print()
+    print_report(results)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+    metadata = bundle['metadata']
+    print(f"\nBest configuration: {format_config(metadata['tuning']['best_config'])}")
+    print(f"Model bundle {bundle['version']} (validation accuracy {metadata['valid_accuracy']:.1%}) "
+          f"has been saved to '{args.output}' after {metadata['tuning']['search_seconds']}s of search")
+
+
+if __name__ == "__main__":
+    main()